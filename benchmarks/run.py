@@ -0,0 +1,218 @@
+"""
+Benchmarks of the loader, of the pages' import-time precomputations and of the callbacks, on synthetic
+datasets of increasing size (see benchmarks.synthetic).
+
+    python -m benchmarks.run --sizes 1000 10000 100000 1000000
+    python -m benchmarks.run --sizes 1000 10000 --compare benchmarks/results/<previous run>.json
+
+Every size runs in its own interpreter with a fresh result cache, so imports and first calls are cold.
+Results are written as JSON (seconds, and bytes of the serialized callback outputs).
+"""
+import argparse
+import glob
+import importlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(ROOT, 'benchmarks')
+DEFAULT_SIZES = [1000, 10000, 100000]
+PAGES = ['index', 'EDA', 'Clustering', 'reseaux']
+# Above this many rows the seaborn pairplot (a figure per pair of features, every point drawn) is skipped
+PAIRPLOT_MAX_ROWS = 50000
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmarkCallback(function, args, repeat):
+    """
+    Time of the first call (cold: nothing memoized yet) and best time of `repeat` more calls (warm),
+    with the time and size of the serialization of the output as sent to the browser.
+    """
+    from dash._utils import to_json
+
+    result, cold = timed(function, *args)
+    warm = min(timed(function, *args)[1] for _ in range(repeat))
+    payload, serialization = timed(to_json, result)
+    return {'cold': cold, 'warm': warm, 'serialization': serialization, 'bytes': len(payload.encode())}
+
+
+def runChild(path, repeat, pairplot_max_rows, skip=()):
+    """
+    Benchmarks of one dataset, in this process: IMDB_DATASET and DASH_CACHE_DIR are set by the parent.
+    """
+    import dash
+    import pandas as pd
+    from dash._callback_context import context_value
+    from dash._utils import AttributeDict
+
+    from data import cache, loader
+
+    # As set by webdash.app
+    pd.set_option('mode.copy_on_write', True)
+    results = {}
+    # The cleaned frame is cached next to the source: drop it to time the first start
+    for stale in glob.glob(os.path.splitext(path)[0] + '.*.npcache'):
+        shutil.rmtree(stale)
+    df, results['loader.parse'] = timed(loader.getDataset, path, False)
+    _, results['loader.first_start'] = timed(loader.getDataset, path)
+    _, results['loader.cached'] = timed(loader.getDataset, path)
+    rows = len(df)
+    del df
+
+    from data.clustering import waitForFits
+    from data.store import getStore
+
+    _, results['store'] = timed(getStore)
+    # Pages are imported one by one, without the app of webdash.app (so without the shared callback cache)
+    dash.Dash(__name__, use_pages=True, pages_folder='')
+    pages = {}
+    for name in PAGES:
+        pages[name], results[f'import.{name}'] = timed(importlib.import_module, f'webdash.pages.{name}')
+        if name == 'Clustering':
+            # KMeans fits are submitted at import and run in the background
+            _, results['import.Clustering.precompute'] = timed(waitForFits)
+
+    index, eda, clustering, reseaux = (pages[name] for name in PAGES)
+    store = getStore()
+    ratings = [float(store.frame()['IMDB_Rating'].min()), float(store.frame()['IMDB_Rating'].max())]
+    context_value.set(AttributeDict(triggered_inputs=[{'prop_id': 'filtered-table.sort_by', 'value': None}]))
+    callbacks = {
+        'update_filtered_results': (
+            index.update_filtered_results, (['Drama'], ratings, 0, [{'column_id': 'Director', 'direction': 'asc'}]),
+        ),
+        'update_kmeans_clusters': (clustering.update_kmeans_clusters, (3,)),
+        'update_dbscan_clusters': (clustering.update_dbscan_clusters, (0.5, 5)),
+        'actor_network': (reseaux.actor_network, ('Action',)),
+        'movie_network': (reseaux.movie_network, (2,)),
+        'update_pairplot': (eda.update_pairplot, (1, list(eda.numeric_features))),
+        'update_graphs': (eda.update_graphs, ('Drama',)),
+    }
+    for name, (function, args) in callbacks.items():
+        if name in skip:
+            results[f'callback.{name}'] = {'skipped': 'requested'}
+            continue
+        if name == 'update_pairplot' and rows > pairplot_max_rows:
+            results[f'callback.{name}'] = {'skipped': f'more than {pairplot_max_rows} rows'}
+            continue
+        results[f'callback.{name}'] = benchmarkCallback(function, args, repeat)
+    return {'rows': rows, 'cache_format': cache.CACHE_FORMAT, 'timings': results}
+
+
+def runSize(size, data_dir, seed, repeat, pairplot_max_rows, skip=()):
+    from benchmarks.synthetic import writeSyntheticCsv
+
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'imdb_synthetic_{size}_{seed}.csv')
+    if not os.path.exists(path):
+        writeSyntheticCsv(path, size, seed)
+    with tempfile.TemporaryDirectory(prefix='dash-cache-') as cache_dir:
+        env = dict(os.environ, IMDB_DATASET=path, DASH_CACHE_DIR=cache_dir, PREWARM_FIGURES='0')
+        child = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.run', '--child', path, '--repeat', str(repeat),
+             '--pairplot-max-rows', str(pairplot_max_rows), '--skip', *skip],
+            cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True, check=True,
+        )
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def environment():
+    import dash
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'packages': {
+            'numpy': numpy.__version__, 'pandas': pandas.__version__,
+            'scikit-learn': sklearn.__version__, 'dash': dash.__version__,
+        },
+    }
+
+
+def flatten(timings):
+    """
+    Seconds per measure, e.g. {'loader.parse': 0.1, 'callback.movie_network.cold': 0.2...}.
+    """
+    flat = {}
+    for name, value in timings.items():
+        if isinstance(value, dict):
+            flat.update({f'{name}.{key}': seconds for key, seconds in value.items()
+                         if isinstance(seconds, float)})
+        else:
+            flat[name] = value
+    return flat
+
+
+def compare(previous, current):
+    """
+    Print the measures of two runs side by side, for the sizes both have.
+    """
+    for size, run in current['results'].items():
+        if size not in previous['results']:
+            continue
+        print(f"\n{size} rows")
+        before, after = flatten(previous['results'][size]['timings']), flatten(run['timings'])
+        for name in after:
+            if name in before and before[name] > 0:
+                print(f"  {name:<55} {before[name]:10.4f}s {after[name]:10.4f}s  x{after[name] / before[name]:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='numbers of movies')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help='warm calls per callback')
+    parser.add_argument('--pairplot-max-rows', type=int, default=PAIRPLOT_MAX_ROWS)
+    parser.add_argument('--skip', nargs='*', default=[], help='callbacks not to run (e.g. movie_network)')
+    parser.add_argument('--data-dir', default=os.path.join(BENCHMARKS_DIR, 'data'),
+                        help='where synthetic datasets are generated (and reused)')
+    parser.add_argument('--output', help='JSON file of the results (default: benchmarks/results/<date>.json)')
+    parser.add_argument('--compare', help='JSON file of a previous run to compare with')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(runChild(args.child, args.repeat, args.pairplot_max_rows, args.skip)))
+        return
+
+    report = {'environment': environment(), 'seed': args.seed, 'repeat': args.repeat, 'skip': args.skip, 'results': {}}
+    for size in args.sizes:
+        print(f"benchmarking {size} rows...", file=sys.stderr)
+        report['results'][str(size)] = runSize(
+            size, args.data_dir, args.seed, args.repeat, args.pairplot_max_rows, args.skip,
+        )
+
+    output = args.output or os.path.join(BENCHMARKS_DIR, 'results', time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {output}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from data.loader import DATASET_PATH
+
+STARS = ['Star1', 'Star2', 'Star3', 'Star4']
+# Columns drawn together from one movie of the real dataset, so that their correlations are kept
+PROFILE_COLUMNS = [
+    'Released_Year', 'Certificate', 'Runtime', 'Genre', 'IMDB_Rating', 'Meta_score', 'No_of_Votes', 'Gross',
+]
+# People per movie of imdb_top_1000.csv (548 directors and 2709 actors for 1000 movies)
+DIRECTORS_PER_MOVIE = 0.548
+ACTORS_PER_MOVIE = 2.709
+# Zipf-like exponents of the popularity of people, giving top counts close to the real ones at 1000 movies
+DIRECTOR_SKEW = 0.4
+ACTOR_SKEW = 0.35
+
+
+def popularity(n_people, skew):
+    """
+    Probabilities of drawing each of n_people, decreasing as rank ** -skew.
+    """
+    weights = np.arange(1, n_people + 1, dtype=np.float64) ** -skew
+    return weights / weights.sum()
+
+
+def poolNames(real_names, n_people):
+    """
+    n_people distinct names: the real ones, then the real ones again with a numeric suffix.
+    """
+    real_names = pd.unique(np.asarray(real_names, dtype=object))
+    names = np.resize(real_names, n_people).astype(object)
+    suffixes = np.arange(n_people) // len(real_names)
+    repeated = suffixes > 0
+    names[repeated] = names[repeated] + ' ' + suffixes[repeated].astype(str)
+    return names
+
+
+def distinctDraws(rng, probabilities, n_rows, n_columns):
+    """
+    (n_rows × n_columns) draws of people codes, distinct within a row (the cast of a movie).
+    """
+    codes = rng.choice(len(probabilities), size=(n_rows, n_columns), p=probabilities)
+    while True:
+        ordered = np.sort(codes, axis=1)
+        repeated = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+        if len(repeated) == 0:
+            return codes
+        codes[repeated] = rng.choice(len(probabilities), size=(len(repeated), n_columns), p=probabilities)
+
+
+def syntheticDataset(n_rows, seed=42, source=DATASET_PATH):
+    """
+    Raw frame with the schema of imdb_top_1000.csv and n_rows movies, as read from the CSV (before cleaning).
+
+    Genres, certificates, years, runtimes, ratings, scores, votes and grosses are drawn together from the
+    movies of the real file, votes and grosses with a random factor so that rows are not duplicates.
+    Directors and actors come from pools growing with the number of movies, drawn with a skewed popularity.
+    """
+    rng = np.random.default_rng(seed)
+    real = pd.read_csv(source)
+    profiles = rng.integers(len(real), size=n_rows)
+    df = real[PROFILE_COLUMNS].iloc[profiles].reset_index(drop=True)
+
+    votes = df['No_of_Votes'] * rng.uniform(0.8, 1.25, n_rows)
+    df['No_of_Votes'] = votes.round().astype(np.int64)
+    gross = pd.to_numeric(df['Gross'].str.replace(',', '', regex=False), errors='coerce')
+    gross = (gross * rng.uniform(0.8, 1.25, n_rows)).round()
+    df['Gross'] = gross.map('{:,.0f}'.format, na_action='ignore')
+
+    titles = real['Series_Title'].to_numpy(dtype=object)[np.arange(n_rows) % len(real)]
+    editions = np.arange(n_rows) // len(real)
+    df.insert(0, 'Series_Title', np.where(editions > 0, titles + ' ' + editions.astype(str), titles))
+    texts = rng.integers(len(real), size=n_rows)
+    df.insert(0, 'Poster_Link', real['Poster_Link'].to_numpy(dtype=object)[texts])
+    df.insert(df.columns.get_loc('IMDB_Rating') + 1, 'Overview', real['Overview'].to_numpy(dtype=object)[texts])
+
+    n_directors = max(1, int(n_rows * DIRECTORS_PER_MOVIE))
+    directors = poolNames(real['Director'], n_directors)
+    df.insert(df.columns.get_loc('Meta_score') + 1, 'Director',
+              directors[rng.choice(n_directors, size=n_rows, p=popularity(n_directors, DIRECTOR_SKEW))])
+
+    n_actors = max(len(STARS), int(n_rows * ACTORS_PER_MOVIE))
+    actors = poolNames(real[STARS].to_numpy().T.ravel(), n_actors)
+    cast = actors[distinctDraws(rng, popularity(n_actors, ACTOR_SKEW), n_rows, len(STARS))]
+    for i, column in enumerate(STARS):
+        df.insert(df.columns.get_loc('Director') + 1 + i, column, cast[:, i])
+    return df[real.columns]
+
+
+def writeSyntheticCsv(path, n_rows, seed=42):
+    syntheticDataset(n_rows, seed).to_csv(path, index=False)
+    return path
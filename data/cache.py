@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+CACHE_FORMAT = 2
+
+
+def defaultMode(mode):
+    """
+    `mode` as masked by the process umask, i.e. the mode os.makedirs or open would give a new directory or file.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return mode & ~umask
+
+
+def cachePath(source_path, key):
+    """
+    Directory holding the columnar cache of a source file, next to it: one .npy per column plus a meta.json.
+    """
+    stem = os.path.splitext(os.path.normpath(source_path))[0]
+    return f"{stem}.{key[:16]}.npcache"
+
+
+def readCache(source_path, key):
+    """
+    Load a cleaned frame written by writeCache, or None when no cache matches the key.
+    Numeric columns and the codes of categorical and string columns are memory-mapped: they are not copied
+    in memory, and every process loading the cache (workers, background callbacks) shares the same pages.
+    String columns come back as categoricals over their vocabulary, which every process parses from meta.json
+    into its own Python strings: only the columns the pages use are cached (see loader.readSource).
+    """
+    path = cachePath(source_path, key)
+    try:
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('format') != CACHE_FORMAT or meta.get('key') != key:
+        return None
+
+    columns = {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(path, f"{column['file']}.npy"), mmap_mode='r')
+        if column['kind'] in ('category', 'object'):
+            columns[column['name']] = pd.Categorical.from_codes(values, column['categories'])
+        else:
+            columns[column['name']] = values
+    df = pd.DataFrame(columns, copy=False)
+    df.attrs['version'] = key
+    return df
+
+
+def writeCache(source_path, key, df):
+    """
+    Write a cleaned frame as a typed columnar cache keyed by `key`, and drop caches of older keys.
+    String columns are dictionary-encoded (codes in the .npy, vocabulary in meta.json). Codes are saved with
+    the dtype pandas gives the codes of a categorical, so that they are mapped as they are.
+    """
+    path = cachePath(source_path, key)
+    directory = os.path.dirname(path) or '.'
+    meta = {'format': CACHE_FORMAT, 'key': key, 'columns': []}
+    tmp_path = None
+    try:
+        tmp_path = tempfile.mkdtemp(prefix='.npcache-', dir=directory)
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            column = {'name': name, 'file': f"col{i}"}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                column['kind'] = 'category'
+                column['categories'] = series.cat.categories.tolist()
+                values = series.cat.codes.to_numpy()
+            elif series.dtype == object:
+                # Vocabulary in order of appearance, missing values are coded -1
+                codes, uniques = pd.factorize(series)
+                column['kind'] = 'object'
+                column['categories'] = uniques.tolist()
+                values = pd.Categorical.from_codes(codes, dtype=pd.CategoricalDtype(uniques), validate=False).codes
+            else:
+                column['kind'] = 'numeric'
+                values = series.to_numpy()
+            np.save(os.path.join(tmp_path, f"{column['file']}.npy"), values)
+            meta['columns'].append(column)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        # mkdtemp makes the directory private to its owner: the user serving the app may not be the one
+        # who built the cache
+        os.chmod(tmp_path, defaultMode(0o777))
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another worker already wrote the same cache, or the directory is read-only
+        if tmp_path is not None:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        return
+
+    prefix = os.path.basename(os.path.splitext(os.path.normpath(source_path))[0]) + '.'
+    for entry in os.listdir(directory):
+        stale = os.path.join(directory, entry)
+        if entry.startswith(prefix) and entry.endswith('.npcache') and stale != path:
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+def artifactPath(source_path, key, name):
+    return os.path.join(cachePath(source_path, key), 'artifacts', f"{name}.joblib")
+
+
+def readArtifact(source_path, key, name):
+    """
+    Load an object derived from the cleaned frame (a fitted model...) stored by writeArtifact, or None.
+    """
+    try:
+        return joblib.load(artifactPath(source_path, key, name))
+    except Exception:
+        # Missing, or written by an incompatible version of its library
+        return None
+
+
+def writeArtifact(source_path, key, name, obj):
+    """
+    Store an object derived from the cleaned frame in its cache, so it goes away with it.
+    Nothing is written when there is no cache for `key`.
+    """
+    path = artifactPath(source_path, key, name)
+    if not os.path.isdir(cachePath(source_path, key)):
+        return
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.artifact-', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            joblib.dump(obj, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,367 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import DBSCAN, KMeans, MiniBatchKMeans
+from sklearn.metrics import pairwise_distances, pairwise_distances_argmin_min, silhouette_score
+from sklearn.neighbors import NearestNeighbors, radius_neighbors_graph
+
+# Silhouette is quadratic in the number of points, it is estimated on a sample above this size
+SILHOUETTE_SAMPLE = 5000
+# Above this many rows, KMeans is a MiniBatchKMeans fitted on a sample, every row then gets its nearest centroid
+SCALABLE_ROWS = 50000
+KMEANS_SAMPLE = 100000
+# DBSCAN neighborhoods grow with the square of the rows at large eps: above this many rows, DBSCAN is fitted
+# on a sample of this size and extended to the other rows
+DBSCAN_SAMPLE = 5000
+# Pairs of the shared DBSCAN neighbor graph (about 20 bytes each): its radius is reduced to stay under it,
+# larger eps run DBSCAN itself. Rows whose distances to all the others estimate the pair count of a radius
+NEIGHBOR_PAIRS = 2_000_000
+NEIGHBOR_PROBE = 200
+# DBSCAN labels kept per process (one per eps and min_samples, a label per row), the least recently used
+# are dropped above it: repeated requests are also answered by the callback cache
+DBSCAN_RESULTS = 16
+# Rows assigned to their nearest centroid or core point at a time
+ASSIGN_CHUNK = 65536
+
+KMeansResult = namedtuple('KMeansResult', ['labels', 'centers', 'inertia', 'silhouette'])
+NeighborGraph = namedtuple('NeighborGraph', ['radius', 'distances', 'rows', 'cols'])
+
+# Every ClusteringCache of the process, to reset their thread pools in forked children
+_caches = weakref.WeakSet()
+
+
+def chunks(features, size=ASSIGN_CHUNK):
+    for start in range(0, len(features), size):
+        yield features[start:start + size]
+
+
+def reservoirSample(chunks, size, random_state=42):
+    """
+    Positions (in increasing order) of a uniform sample of `size` rows from an iterable of chunks, read once.
+
+    Every row draws a random key and the reservoir keeps the `size` smallest, so the sample does not depend
+    on the chunking, and with the same random_state a smaller sample is a subset of a larger one.
+    """
+    rng = np.random.default_rng(random_state)
+    keys = np.empty(0)
+    positions = np.empty(0, dtype=np.int64)
+    start = 0
+    for chunk in chunks:
+        keys = np.concatenate([keys, rng.random(len(chunk))])
+        positions = np.concatenate([positions, np.arange(start, start + len(chunk))])
+        start += len(chunk)
+        if len(keys) > size:
+            kept = np.argpartition(keys, size - 1)[:size]
+            keys, positions = keys[kept], positions[kept]
+    return np.sort(positions)
+
+
+def assignNearest(features, centers):
+    """
+    Label of the nearest center of every row, and the squared distance to it, computed by chunks of rows.
+    """
+    labels = np.empty(len(features), dtype=np.int64)
+    distances = np.empty(len(features))
+    start = 0
+    for chunk in chunks(features):
+        labels[start:start + len(chunk)], distances[start:start + len(chunk)] = pairwise_distances_argmin_min(
+            chunk, centers, metric='sqeuclidean',
+        )
+        start += len(chunk)
+    return labels, distances
+
+
+def neighborRadius(features, radius, max_pairs=NEIGHBOR_PAIRS, probe=NEIGHBOR_PROBE, random_state=42):
+    """
+    Largest radius up to `radius` whose radius-neighbor graph of `features` has about max_pairs pairs
+    at most, estimated from the distances of `probe` random rows to all the rows.
+    """
+    n_points = len(features)
+    if n_points * (n_points - 1) <= max_pairs:
+        return radius
+    rng = np.random.default_rng(random_state)
+    probed = rng.choice(n_points, size=min(probe, n_points), replace=False)
+    distances = np.sort(pairwise_distances(features[probed], features).ravel())
+    # Each probed row stands for n_points / len(probed) rows, and its distance to itself is not a pair
+    kept = len(probed) + int(max_pairs * len(probed) / n_points)
+    if kept >= len(distances):
+        return radius
+    return min(radius, float(distances[kept - 1]))
+
+
+def dbscanLabels(n_points, rows, cols, min_samples):
+    """
+    DBSCAN labels and core point mask of n_points from the (row, col) pairs of points within eps of each
+    other, both ways and grouped by row, in linear time in the number of pairs. Labels are the ones of
+    sklearn.cluster.DBSCAN: clusters are numbered by their lowest core point, and a border point joins
+    the lowest numbered cluster among its core neighbors.
+    """
+    # The point itself counts in its neighborhood
+    core = np.bincount(rows, minlength=n_points) + 1 >= min_samples
+
+    # Clusters are the connected components of the core points. Pairs are symmetric, so strong components
+    # are the undirected ones, without building the transpose
+    core_edges = core[rows] & core[cols]
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows[core_edges], minlength=n_points))])
+    adjacency = sparse.csr_matrix((np.ones(indptr[-1]), cols[core_edges], indptr), shape=(n_points, n_points))
+    _, components = connected_components(adjacency, directed=True, connection='strong')
+    core_points = np.flatnonzero(core)
+    clusters, first_core = np.unique(components[core_points], return_index=True)
+    numbering = np.empty(n_points, dtype=np.int64)
+    numbering[clusters[np.argsort(first_core)]] = np.arange(len(clusters))
+    labels = np.full(n_points, -1, dtype=np.int64)
+    labels[core_points] = numbering[components[core_points]]
+
+    border_edges = ~core[rows] & core[cols]
+    border = np.full(n_points, n_points, dtype=np.int64)
+    np.minimum.at(border, rows[border_edges], labels[cols[border_edges]])
+    reached = border < n_points
+    labels[reached] = border[reached]
+    return labels, core
+
+
+def extendDBSCAN(features, sample_features, sample_labels, core, eps):
+    """
+    Extend DBSCAN labels fitted on a sample to all rows: a row joins the cluster of its nearest core point
+    of the sample when within eps, and is noise otherwise.
+    """
+    labels = np.full(len(features), -1, dtype=np.int64)
+    core_points = np.flatnonzero(core)
+    if not len(core_points):
+        return labels
+    nearest = NearestNeighbors(n_neighbors=1).fit(sample_features[core_points])
+    start = 0
+    for chunk in chunks(features):
+        distances, neighbors = nearest.kneighbors(chunk)
+        labels[start:start + len(chunk)] = np.where(
+            distances[:, 0] <= eps, sample_labels[core_points[neighbors[:, 0]]], -1,
+        )
+        start += len(chunk)
+    return labels
+
+
+class ClusteringCache:
+    """
+    Clustering results of a feature matrix, computed once per (dataset version, features, algorithm, parameters).
+
+    Fits run on a small thread pool (scikit-learn releases the GIL while fitting), concurrent requests
+    for the same parameters share a single fit, and precompute() submits a whole parameter range ahead.
+    DBSCAN fits with eps up to `neighbor_radius` reuse one radius-neighbor graph, built on the first of them.
+    Its radius is reduced so that it holds about `neighbor_pairs` pairs at most, larger eps run DBSCAN itself.
+
+    Above `scalable_rows` rows, KMeans becomes a MiniBatchKMeans fitted on a reservoir sample of the rows,
+    and above `dbscan_rows` rows, DBSCAN runs on a reservoir sample of that many rows. Every row is then
+    assigned to its nearest centroid (or core point) by chunks.
+    """
+
+    def __init__(self, version, feature_names, features, neighbor_radius=None, workers=2,
+                 scalable_rows=SCALABLE_ROWS, dbscan_rows=DBSCAN_SAMPLE, neighbor_pairs=NEIGHBOR_PAIRS):
+        self.version = version
+        self.feature_names = tuple(feature_names)
+        self.features = features
+        # Largest DBSCAN eps the shared neighbor graph is built for, before the pair budget
+        self.neighbor_radius = neighbor_radius
+        self.neighbor_pairs = neighbor_pairs
+        self.scalable = len(features) > scalable_rows
+        self.dbscan_sampled = len(features) > dbscan_rows
+        self.kmeans_sample = self.dbscan_sample = None
+        self.kmeans_features = self.dbscan_features = features
+        if self.scalable:
+            self.kmeans_sample = reservoirSample(chunks(features), KMEANS_SAMPLE)
+            self.kmeans_features = features[self.kmeans_sample]
+        if self.dbscan_sampled:
+            self.dbscan_sample = reservoirSample(chunks(features), dbscan_rows)
+            self.dbscan_features = features[self.dbscan_sample]
+        self._results = {}
+        self._dbscan_results = OrderedDict()
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='clustering')
+        _caches.add(self)
+
+    def wait(self):
+        """
+        Wait for the fits submitted so far (precompute()...) to finish.
+        """
+        with self._lock:
+            futures = list(self._results.values()) + list(self._dbscan_results.values())
+        wait(futures)
+
+    def _after_fork(self):
+        # The pool threads do not survive a fork: finished results are kept, unfinished ones are refitted
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='clustering')
+        self._results = {key: future for key, future in self._results.items() if future.done()}
+        self._dbscan_results = OrderedDict(
+            (key, future) for key, future in self._dbscan_results.items() if future.done()
+        )
+
+    def key(self, algorithm, **params):
+        return (self.version, self.feature_names, algorithm, tuple(sorted(params.items())))
+
+    def _submit(self, key, fit):
+        with self._lock:
+            if key not in self._results:
+                self._results[key] = self._pool.submit(fit)
+            return self._results[key]
+
+    def kmeans(self, n_clusters, warm_start=False):
+        """
+        KMeans fit with n_clusters, as fitted by the page (k-means++, random_state=42), or a MiniBatchKMeans
+        fit on a sample in scalable mode.
+
+        With warm_start, the fit starts from the (n_clusters - 1) centroids plus the point farthest
+        from them: a single run instead of the n_init runs of k-means++, cached under its own key.
+        """
+        if warm_start and n_clusters > 2:
+            return self._warm_kmeans(n_clusters)
+        key = self.key('kmeans', n_clusters=n_clusters, random_state=42)
+        return self._submit(key, lambda: self._fit_kmeans(n_clusters)).result()
+
+    def _warm_kmeans(self, n_clusters):
+        key = self.key('kmeans', n_clusters=n_clusters, random_state=42, warm_start=True)
+        with self._lock:
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = self._results[key] = Future()
+        if owner:
+            try:
+                previous = self.kmeans(n_clusters - 1, warm_start=True)
+                _, distances = pairwise_distances_argmin_min(self.kmeans_features, previous.centers)
+                init = np.vstack([previous.centers, self.kmeans_features[np.argmax(distances)]])
+                future.set_result(self._fit_kmeans(n_clusters, init))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    def _fit_kmeans(self, n_clusters, init=None):
+        if self.scalable:
+            return self._fit_minibatch_kmeans(n_clusters, init)
+        if init is None:
+            kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+        else:
+            kmeans = KMeans(n_clusters=n_clusters, init=init, n_init=1, random_state=42)
+        labels = kmeans.fit_predict(self.features)
+        return KMeansResult(labels, kmeans.cluster_centers_, kmeans.inertia_, self._silhouette(labels, n_clusters))
+
+    def _fit_minibatch_kmeans(self, n_clusters, init=None):
+        if init is None:
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, n_init=3, batch_size=4096, random_state=42)
+        else:
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, init=init, n_init=1, batch_size=4096, random_state=42)
+        kmeans.fit(self.kmeans_features)
+        labels, distances = assignNearest(self.features, kmeans.cluster_centers_)
+        return KMeansResult(labels, kmeans.cluster_centers_, distances.sum(), self._silhouette(labels, n_clusters))
+
+    def _silhouette(self, labels, n_clusters):
+        if not 1 < n_clusters < len(self.features):
+            return np.nan
+        return silhouette_score(
+            self.features, labels, sample_size=min(len(self.features), SILHOUETTE_SAMPLE), random_state=42,
+        )
+
+    def precompute(self, cluster_range, warm_start=False):
+        """
+        Fit KMeans for every n_clusters of the range in the background. Warm-started fits depend on each
+        other, they run one after the other in a single thread.
+        """
+        if warm_start:
+            threading.Thread(
+                target=self.kmeans, args=(max(cluster_range),), kwargs={'warm_start': True},
+                name='clustering-warm-start', daemon=True,
+            ).start()
+            return
+        for n_clusters in cluster_range:
+            self._submit(self.key('kmeans', n_clusters=n_clusters, random_state=42),
+                         lambda n_clusters=n_clusters: self._fit_kmeans(n_clusters))
+
+    def _neighbor_graph_future(self):
+        key = self.key('radius_neighbors', radius=self.neighbor_radius)
+        return self._submit(key, self._build_neighbor_graph)
+
+    def _build_neighbor_graph(self):
+        radius = neighborRadius(self.dbscan_features, self.neighbor_radius, self.neighbor_pairs)
+        graph = radius_neighbors_graph(self.dbscan_features, radius, mode='distance', n_jobs=-1)
+        rows = np.repeat(np.arange(graph.shape[0]), np.diff(graph.indptr))
+        return NeighborGraph(radius, graph.data, rows, graph.indices)
+
+    def neighbor_graph(self):
+        """
+        Pairs of points (of the DBSCAN sample above dbscan_rows) closer than the graph's radius (at most
+        neighbor_radius) and their distance, both ways and grouped by row. Built on the first call.
+        """
+        return self._neighbor_graph_future().result()
+
+    def dbscan(self, eps, min_samples):
+        """
+        DBSCAN labels (-1 for noise), as int32, the last DBSCAN_RESULTS of them kept. Within the radius of
+        the neighbor graph, labels are derived from it: finding neighborhoods, the costly part of DBSCAN,
+        is then a filter of its pairs by eps.
+        Above dbscan_rows, DBSCAN runs on a sample and the other rows are extended with extendDBSCAN().
+        """
+        key = self.key('dbscan', eps=eps, min_samples=min_samples)
+        graph = None
+        if self.neighbor_radius is not None and eps <= self.neighbor_radius:
+            graph = self.neighbor_graph()
+            if eps > graph.radius:
+                graph = None
+        with self._lock:
+            future = self._dbscan_results.get(key)
+            if future is None:
+                future = self._dbscan_results[key] = self._pool.submit(self._fit_dbscan, eps, min_samples, graph)
+            self._dbscan_results.move_to_end(key)
+            while len(self._dbscan_results) > DBSCAN_RESULTS:
+                self._dbscan_results.popitem(last=False)
+        return future.result()
+
+    def _fit_dbscan(self, eps, min_samples, graph=None):
+        if graph is not None:
+            within = graph.distances <= eps
+            labels, core = dbscanLabels(
+                len(self.dbscan_features), graph.rows[within], graph.cols[within], min_samples,
+            )
+        else:
+            dbscan = DBSCAN(eps=eps, min_samples=min_samples).fit(self.dbscan_features)
+            labels = dbscan.labels_
+            core = np.zeros(len(labels), dtype=bool)
+            core[dbscan.core_sample_indices_] = True
+        if not self.dbscan_sampled:
+            return labels.astype(np.int32)
+        extended = extendDBSCAN(self.features, self.dbscan_features, labels, core, eps)
+        # The sampled rows keep their own labels, border points included
+        extended[self.dbscan_sample] = labels
+        return extended.astype(np.int32)
+
+    def kmeans_scores(self, cluster_range, warm_start=False):
+        """
+        Inertia and silhouette per n_clusters, for choosing k.
+        """
+        results = {n_clusters: self.kmeans(n_clusters, warm_start) for n_clusters in cluster_range}
+        return {
+            'n_clusters': list(results),
+            'inertia': [result.inertia for result in results.values()],
+            'silhouette': [result.silhouette for result in results.values()],
+        }
+
+
+def waitForFits():
+    """
+    Wait for the fits submitted to every ClusteringCache of the process, e.g. before forking workers.
+    """
+    for clusters in list(_caches):
+        clusters.wait()
+
+
+def _afterFork():
+    for clusters in list(_caches):
+        clusters._after_fork()
+
+
+os.register_at_fork(after_in_child=_afterFork)
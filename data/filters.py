@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+
+class MovieFilter:
+    """
+    Rating range and multi-genre filter over the movies of a dataset.
+
+    Ratings are sorted once so a range is two binary searches, and genres are
+    tested against the packed bitsets of a GenreIndex, so selecting movies with
+    all of several genres is a bitwise AND rather than a scan of the Genre strings.
+    """
+
+    def __init__(self, ratings, genres):
+        ratings = np.asarray(ratings, dtype=np.float64)
+        self.order = np.argsort(ratings, kind='stable')
+        self.sorted_ratings = ratings[self.order]
+        self.genres = genres
+        self.size = len(ratings)
+
+    def rows(self, genres=None, rating_range=None):
+        """
+        Positions, in dataset order, of the movies rated within `rating_range` (bounds included) having all `genres`.
+        """
+        if rating_range is None:
+            candidates = self.order
+        else:
+            start = np.searchsorted(self.sorted_ratings, rating_range[0], side='left')
+            stop = np.searchsorted(self.sorted_ratings, rating_range[1], side='right')
+            candidates = self.order[start:stop]
+
+        # Large selections go through a mask of the dataset, small ones test their genre bits and get sorted
+        # back to dataset order, so the cost follows the smaller of the dataset and the selection
+        if len(candidates) > self.size // 16:
+            if len(candidates) == self.size:
+                mask = np.ones(self.size, dtype=bool)
+            else:
+                mask = np.zeros(self.size, dtype=bool)
+                mask[candidates] = True
+            if genres:
+                mask &= self.genres.mask(genres)
+            return np.flatnonzero(mask)
+
+        if genres:
+            bits = self.genres.bitmap(genres)
+            candidates = candidates[(bits[candidates >> 3] >> (7 - (candidates & 7))) & 1 == 1]
+        return np.sort(candidates)
+
+
+def sortRanks(df, columns):
+    """
+    Rank of every row in each of `columns` (missing values first), computed once so that
+    sorting any selection of rows is an argsort of integers instead of a sort of the values.
+    """
+    # Values rather than categories are sorted: categories are in order of appearance
+    return {column: pd.factorize(df[column].to_numpy(dtype=object), sort=True)[0] for column in columns}
+
+
+def sortRows(rows, ranks, descending=False):
+    """
+    Sort row positions by their rank, keeping dataset order between equal values.
+    """
+    keys = ranks[rows]
+    if descending:
+        keys = -keys
+    return rows[np.argsort(keys, kind='stable')]
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data.networks import coOccurrence
+
+SEPARATOR = ', '
+
+
+class GenreIndex:
+    """
+    Movie × genre incidence of a comma-separated genre column, built once.
+
+    - matrix: sparse boolean CSR matrix, one row per movie and one column per genre of `vocabulary`
+    - bitmaps: one packed bitset of the movies per genre, so genre filters are bitwise operations
+    - vocabulary: genres sorted by name, appearance: genres in order of first appearance in the column
+    """
+
+    def __init__(self, genres, separator=SEPARATOR):
+        # Only the distinct genre combinations are split, not every row
+        codes, combinations = pd.factorize(genres)
+        split = [str(combination).split(separator) for combination in combinations] + [[]]
+        codes = np.where(codes == -1, len(combinations), codes)
+
+        self.appearance = list(dict.fromkeys(genre for parts in split for genre in parts))
+        self.vocabulary = sorted(self.appearance)
+        self.size = len(codes)
+        column = {genre: i for i, genre in enumerate(self.vocabulary)}
+        combination_rows = np.repeat(np.arange(len(split)), [len(parts) for parts in split])
+        combination_columns = np.array([column[genre] for parts in split for genre in parts], dtype=np.int32)
+        combination_matrix = sparse.csr_matrix(
+            (np.ones(len(combination_rows), dtype=bool), (combination_rows, combination_columns)),
+            shape=(len(split), len(self.vocabulary)),
+        )
+        self.matrix = combination_matrix[codes]
+
+        by_genre = self.matrix.tocsc()
+        self.bitmaps = np.zeros((len(self.vocabulary), (self.size + 7) // 8), dtype=np.uint8)
+        for i in range(len(self.vocabulary)):
+            members = np.zeros(self.size, dtype=bool)
+            members[by_genre.indices[by_genre.indptr[i]:by_genre.indptr[i + 1]]] = True
+            self.bitmaps[i] = np.packbits(members)
+        self._column = column
+        self._cooccurrence = None
+
+    def __contains__(self, genre):
+        return genre in self._column
+
+    def bitmap(self, genres):
+        """
+        Packed bitset of the movies having all the given genres (all movies when no genre is given).
+        """
+        bits = np.full(self.bitmaps.shape[1], 0xFF, dtype=np.uint8)
+        for genre in genres or []:
+            if genre not in self._column:
+                return np.zeros_like(bits)
+            np.bitwise_and(bits, self.bitmaps[self._column[genre]], out=bits)
+        return bits
+
+    def mask(self, genres):
+        """
+        Boolean mask of the movies having all the given genres.
+        """
+        return np.unpackbits(self.bitmap(genres), count=self.size).astype(bool)
+
+    def rows(self, genres):
+        return np.flatnonzero(self.mask(genres))
+
+    def counts(self):
+        """
+        Number of movies per genre, most frequent first, ties in order of appearance.
+        """
+        counts = pd.Series(np.asarray(self.matrix.sum(axis=0)).ravel(), index=self.vocabulary)
+        return counts[self.appearance].sort_values(ascending=False, kind='stable')
+
+    def sums(self, values):
+        """
+        Sum of `values` (one per movie) over the movies of each genre.
+        """
+        return pd.Series(self.matrix.T.astype(np.float64) @ np.asarray(values, dtype=np.float64), index=self.vocabulary)
+
+    def cooccurrence(self):
+        """
+        Number of movies per genre and per pair of genres (see data.networks.coOccurrence), in vocabulary order.
+        """
+        if self._cooccurrence is None:
+            self._cooccurrence = coOccurrence(self.matrix)
+        return self._cooccurrence
+
+    def explode(self):
+        """
+        Long form of the index: the row position of each (movie, genre) pair and the genre name.
+        """
+        positions = np.repeat(np.arange(self.size), np.diff(self.matrix.indptr))
+        return positions, np.asarray(self.vocabulary, dtype=object)[self.matrix.indices]
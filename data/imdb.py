@@ -0,0 +1,181 @@
+import glob
+import hashlib
+import logging
+import os
+import time
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500_000
+
+# Files of the IMDb dumps (https://datasets.imdbws.com), plain or gzipped
+BASICS = 'title.basics.tsv'
+RATINGS = 'title.ratings.tsv'
+PRINCIPALS = 'title.principals.tsv'
+NAMES = 'name.basics.tsv'
+
+STARS = ['Star1', 'Star2', 'Star3', 'Star4']
+# Columns of imdb_top_1000.csv used by the pages, in the same order
+COLUMNS = [
+    'Series_Title', 'Released_Year', 'Certificate', 'Runtime', 'Genre', 'IMDB_Rating',
+    'Meta_score', 'Director', *STARS, 'No_of_Votes', 'Gross',
+]
+
+
+def dumpFile(directory, name):
+    """
+    Path of a dump file in `directory`, gzipped or not, None when missing.
+    """
+    for path in (os.path.join(directory, name), os.path.join(directory, name + '.gz')):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def requiredDumpFile(directory, name):
+    """
+    Path of a dump file the frame cannot be built without, gzipped or not.
+    """
+    path = dumpFile(directory, name)
+    if path is None:
+        raise FileNotFoundError(f"{directory} is not a complete IMDb dump: {name} (or {name}.gz) is missing")
+    return path
+
+
+def isImdbDump(path):
+    """
+    Whether `path` is a directory of IMDb dumps. One holding only part of the required files is one too,
+    so that readImdbDump() names the missing file instead of the directory being read as a CSV.
+    """
+    return os.path.isdir(path) and any(dumpFile(path, name) is not None for name in (BASICS, RATINGS))
+
+
+def dumpVersion(directory, code_files):
+    """
+    Hash of the dump files' names, sizes and modification times and of the cleaning code.
+    Hashing the content of multi-gigabyte dumps on every start would cost more than loading them.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(directory, '*.tsv*'))):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    for file in code_files:
+        with open(file, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def readChunks(path, columns, chunksize):
+    return pd.read_csv(
+        path, sep='\t', usecols=columns, na_values='\\N', keep_default_na=False,
+        quoting=3, dtype=str, chunksize=chunksize,
+    )
+
+
+def readRatings(path, chunksize, min_votes):
+    ratings = []
+    for chunk in readChunks(path, ['tconst', 'averageRating', 'numVotes'], chunksize):
+        chunk['numVotes'] = pd.to_numeric(chunk['numVotes'], errors='coerce')
+        ratings.append(chunk[chunk['numVotes'] >= min_votes])
+    return pd.concat(ratings).set_index('tconst')
+
+
+def readTitles(path, ratings, title_types, chunksize, clean_chunk):
+    """
+    Stream title.basics, keep rated titles of the given types, map them to the dashboard's
+    columns and parse each chunk. Only the kept rows of each chunk stay in memory.
+    """
+    columns = ['tconst', 'titleType', 'primaryTitle', 'startYear', 'runtimeMinutes', 'genres']
+    titles = []
+    for chunk in readChunks(path, columns, chunksize):
+        chunk = chunk[chunk['titleType'].isin(title_types) & chunk['tconst'].isin(ratings.index)]
+        rated = ratings.loc[chunk['tconst']]
+        chunk = pd.DataFrame({
+            'tconst': chunk['tconst'].to_numpy(),
+            'Series_Title': chunk['primaryTitle'].to_numpy(),
+            'Released_Year': chunk['startYear'].to_numpy(),
+            'Runtime': chunk['runtimeMinutes'].to_numpy(),
+            'Genre': chunk['genres'].str.replace(',', ', ', regex=False).to_numpy(),
+            'IMDB_Rating': rated['averageRating'].to_numpy(),
+            'No_of_Votes': rated['numVotes'].to_numpy(),
+        })
+        titles.append(clean_chunk(chunk))
+    return concatChunks(titles)
+
+
+def readPeople(principals_path, names_path, tconsts, chunksize):
+    """
+    Director and first four actors of each kept title, by billing order, with their names from name.basics.
+    """
+    people = []
+    kept = pd.Index(tconsts)
+    for chunk in readChunks(principals_path, ['tconst', 'ordering', 'nconst', 'category'], chunksize):
+        chunk = chunk[chunk['tconst'].isin(kept) & chunk['category'].isin(['director', 'actor', 'actress'])]
+        people.append(chunk)
+    people = pd.concat(people)
+    people['ordering'] = pd.to_numeric(people['ordering'])
+    people = people.sort_values(['tconst', 'ordering'])
+    people['role'] = people['category'].where(people['category'] == 'director', 'star')
+    people['rank'] = people.groupby(['tconst', 'role']).cumcount()
+
+    if names_path is not None:
+        needed = pd.Index(people['nconst'].unique())
+        names = []
+        for chunk in readChunks(names_path, ['nconst', 'primaryName'], chunksize):
+            names.append(chunk[chunk['nconst'].isin(needed)])
+        names = pd.concat(names).set_index('nconst')['primaryName']
+        people['name'] = people['nconst'].map(names).fillna(people['nconst'])
+    else:
+        people['name'] = people['nconst']
+
+    directors = people[(people['role'] == 'director') & (people['rank'] == 0)].set_index('tconst')['name']
+    stars = people[(people['role'] == 'star') & (people['rank'] < len(STARS))]
+    stars = stars.pivot(index='tconst', columns='rank', values='name')
+    stars.columns = [STARS[rank] for rank in stars.columns]
+    return directors.rename('Director').to_frame().join(stars, how='outer').reindex(columns=['Director'] + STARS)
+
+
+def concatChunks(chunks):
+    """
+    Concatenate parsed chunks, merging the categories of categorical columns instead of falling back to strings.
+    """
+    if not chunks:
+        return pd.DataFrame()
+    columns = {}
+    for name in chunks[0].columns:
+        parts = [chunk[name] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[name] = pd.Series(union_categoricals([part.array for part in parts]))
+        else:
+            columns[name] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def readImdbDump(directory, clean_chunk, title_types=('movie',), min_votes=0, chunksize=CHUNK_SIZE):
+    """
+    Build the dashboard's frame from the IMDb TSV dumps in `directory`, reading every file chunk by chunk
+    and projecting only the columns the pages use, so peak memory follows the output and not the dumps.
+    title.principals and name.basics are optional, without them directors and stars are left missing.
+    """
+    start = time.perf_counter()
+    basics_path, ratings_path = requiredDumpFile(directory, BASICS), requiredDumpFile(directory, RATINGS)
+    ratings = readRatings(ratings_path, chunksize, min_votes)
+    df = readTitles(basics_path, ratings, list(title_types), chunksize, clean_chunk)
+    logger.info("read %d titles from %s in %.3fs", len(df), directory, time.perf_counter() - start)
+
+    principals_path = dumpFile(directory, PRINCIPALS)
+    if principals_path is not None and len(df):
+        people = readPeople(principals_path, dumpFile(directory, NAMES), df['tconst'], chunksize)
+        people = people.reindex(df['tconst'])
+        for name in people.columns:
+            df[name] = people[name].astype(object).to_numpy()
+        logger.info("read crew of %d titles in %.3fs", len(people), time.perf_counter() - start)
+    else:
+        for name in ['Director'] + STARS:
+            df[name] = None
+    for name in ['Certificate', 'Meta_score', 'Gross']:
+        df[name] = float('nan')
+    return df[COLUMNS]
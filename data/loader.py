@@ -1,23 +1,158 @@
-import pandas as pd
+import hashlib
+import logging
+import os
+import time
+from collections import namedtuple
+
 import numpy as np
+import pandas as pd
+
+from data import cache, imdb
+
+logger = logging.getLogger(__name__)
+
+DATASET_PATH = os.path.join(os.path.dirname(__file__), 'imdb_top_1000.csv')
+# Either a CSV with the columns of imdb_top_1000.csv, or a directory holding the IMDb TSV dumps
+SOURCE_PATH = os.environ.get('IMDB_DATASET', DATASET_PATH)
+
+"""
+Cleaning rule of a column:
+- dtype: final dtype of the column
+- parser: vectorized function turning the raw column into values, unparsable ones becoming NaN (None keeps the raw values)
+- impute: value replacing the missing ones, 'mean' for the column mean, or a function of the parsed column returning that value
+"""
+Column = namedtuple('Column', ['dtype', 'parser', 'impute'])
+
+def parse_number(values):
+    return pd.to_numeric(values, errors='coerce')
+
+def parse_thousands(values):
+    return pd.to_numeric(values.astype(str).str.replace(',', '', regex=False), errors='coerce')
+
+def parse_leading_int(values):
+    return pd.to_numeric(values.astype(str).str.extract(r'(\d+)', expand=False), errors='coerce')
+
+def gross_mean(values):
+    # Historically missing grosses were counted as 0 when computing the mean used to fill them
+    return values.fillna(0).mean()
+
+SCHEMA = {
+    'Released_Year': Column('int16', parse_number, 1995),
+    'Certificate': Column('category', None, 'U'),
+    # Some titles of the full IMDb catalogue run for days
+    'Runtime': Column('int32', parse_leading_int, 0),
+    'Genre': Column('category', None, 'Unknown'),
+    'IMDB_Rating': Column('float64', parse_number, None),
+    'Meta_score': Column('float64', parse_number, 'mean'),
+    'Director': Column('category', None, None),
+    'No_of_Votes': Column('int32', parse_number, 0),
+    'Gross': Column('float64', parse_thousands, gross_mean),
+}
+
+def datasetVersion(path=DATASET_PATH):
+    """
+    Hash of the source file and of the cleaning code, used as the dataset version and cache key.
+    """
+    digest = hashlib.sha256()
+    for file in (path, __file__, cache.__file__):
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def cleanColumn(values, column, parse=True, impute=True):
+    """
+    Parse, impute and cast one column, returning it with the number of values that were missing or unparsable.
+    Parsing and imputation can be run separately, e.g. parsing chunk by chunk and imputing once all chunks are read.
+    """
+    if parse and column.parser is not None:
+        values = column.parser(values)
+    missing = int(values.isna().sum())
+    if impute and column.impute is not None and missing:
+        if column.impute == 'mean':
+            fill = values.mean()
+        elif callable(column.impute):
+            fill = column.impute(values)
+        else:
+            fill = column.impute
+        if isinstance(values.dtype, pd.CategoricalDtype) and fill not in values.cat.categories:
+            values = values.cat.add_categories([fill])
+        values = values.fillna(fill)
+    if column.dtype == 'category':
+        # Categories keep their order of appearance, so ties in counts are ordered as with plain strings
+        return values.astype(pd.CategoricalDtype(values.dropna().unique())), missing
+    if values.hasnans:
+        # Integer columns cannot hold missing values until they are imputed
+        return values.astype('float64'), missing
+    dtype = np.dtype(column.dtype)
+    if dtype.kind in 'iu' and len(values):
+        # astype wraps integers around instead of failing
+        limits = np.iinfo(dtype)
+        low, high = values.min(), values.max()
+        if low < limits.min or high > limits.max:
+            raise ValueError(f"values from {low} to {high} of {values.name!r} do not fit in {dtype}")
+    return values.astype(dtype), missing
+
+def cleanDataset(df, schema=SCHEMA, report=None, parse=True, impute=True):
+    """
+    Apply the column schema to a raw frame. Each stage (one per column) is timed and logged with
+    its number of rows and of missing or unparsable values, and appended to `report` when given.
+    """
+    for name, column in schema.items():
+        if name not in df.columns:
+            continue
+        start = time.perf_counter()
+        df[name], missing = cleanColumn(df[name], column, parse=parse, impute=impute)
+        stage = {
+            'stage': name,
+            'rows': len(df),
+            'missing': missing,
+            'seconds': time.perf_counter() - start,
+        }
+        logger.debug("clean %(stage)s: %(rows)d rows, %(missing)d missing, %(seconds).4fs", stage)
+        if report is not None:
+            report.append(stage)
+    return df
+
+def readSource(path):
+    """
+    Read and clean the columns of imdb.COLUMNS from a source. IMDb dumps are streamed: each chunk is parsed
+    on the fly and the imputations, which need statistics of whole columns, run once at the end.
+    """
+    start = time.perf_counter()
+    if imdb.isImdbDump(path):
+        df = imdb.readImdbDump(path, lambda chunk: cleanDataset(chunk, impute=False))
+        return cleanDataset(df, parse=False)
+
+    # Only the columns the pages use: the poster links and overviews, unique to every movie, would only
+    # weigh on the cache and on every process
+    df = pd.read_csv(path, usecols=lambda name: name in imdb.COLUMNS)
+    logger.info("read %s: %d rows in %.3fs", path, len(df), time.perf_counter() - start)
+    return cleanDataset(df)
+
+def getDataset(path=SOURCE_PATH, use_cache=True):
+    """
+    Load the cleaned dataset. The cleaned frame is cached next to the source
+    and reused as long as neither the source nor the cleaning code changed.
+    Columns of the returned frame are memory-mapped from that cache whenever it could be written.
+    """
+    if imdb.isImdbDump(path):
+        version = imdb.dumpVersion(path, (__file__, cache.__file__, imdb.__file__))
+    else:
+        version = datasetVersion(path)
+    if use_cache:
+        df = cache.readCache(path, version)
+        if df is not None:
+            df.attrs['source'] = path
+            return df
 
-def getDataset():
-    df = pd.read_csv('./data/imdb_top_1000.csv')
-    def clean_year(year):
-        try:
-            return int(year)
-        except ValueError:
-            return 1995
-    
-    df['Released_Year'] = df['Released_Year'].apply(clean_year)
-    df['Released_Year'] = pd.to_datetime(df['Released_Year'], format='%Y').dt.year
-    df["Gross"] = df["Gross"].str.replace(",","")
-    df["Gross"] = df["Gross"].replace(np.nan, 0)
-    df["Gross"] = df["Gross"].astype(int)
-    df['Runtime'] = df['Runtime'].astype(str).str.extract('(\d+)', expand=False)
-    df['Runtime'] = pd.to_numeric(df['Runtime'], errors='coerce').fillna(0).astype(int)
-    df['Meta_score'] = df['Meta_score'].fillna(df['Meta_score'].mean())
-    df["Gross"] = df["Gross"].replace(0,df['Gross'].mean())
-    df['Certificate'] = df['Certificate'].fillna('U')
-
-    return df
\ No newline at end of file
+    df = readSource(path)
+    if use_cache:
+        cache.writeCache(path, version, df)
+        # Read back, so that the first start also maps the cache instead of holding its own copy
+        cached = cache.readCache(path, version)
+        if cached is not None:
+            df = cached
+    df.attrs['version'] = version
+    df.attrs['source'] = path
+    return df
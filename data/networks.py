@@ -0,0 +1,171 @@
+from collections import namedtuple
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def coOccurrence(incidence):
+    """
+    Co-occurrences of the items (columns) of a sparse rows × items incidence matrix, in one product Mᵀ·M:
+    the number of rows having each item, and the number of rows having each pair of items as a sparse
+    upper-triangular COO matrix.
+    """
+    incidence = sparse.csr_matrix(incidence, dtype=np.int64)
+    product = incidence.T @ incidence
+    return product.diagonal(), sparse.triu(product, k=1, format='coo')
+
+
+def coOccurrenceGraph(names, counts, pairs, order=None):
+    """
+    Graph of co-occurring items: one node per item (attribute `weight`, its count) and one edge per pair of
+    items occurring together (attribute `weight`, the number of co-occurrences). Nodes are added in `order`
+    (by default the order of `names`), which layouts depend on.
+    """
+    names = np.asarray(names, dtype=object)
+    G = nx.Graph()
+    G.add_nodes_from(names if order is None else order)
+    nx.set_node_attributes(G, dict(zip(names, counts.tolist())), 'weight')
+    G.add_weighted_edges_from(zip(names[pairs.row], names[pairs.col], pairs.data.tolist()))
+    return G
+
+
+class CollaborationIndex:
+    """
+    People of some columns of the movies (Star1..Star4), coded once as integer IDs, with their sparse
+    movie × person incidence matrix, so that the collaborations within any selection of movies are
+    a slice of the matrix and a product.
+    """
+
+    def __init__(self, people):
+        # Column after column, the order of pd.melt
+        codes, self.names = pd.factorize(people.to_numpy(dtype=object).T.ravel())
+        self.codes = codes.reshape(people.shape[1], len(people))
+        movies = np.broadcast_to(np.arange(len(people)), self.codes.shape)
+        known = self.codes >= 0
+        self.matrix = sparse.csr_matrix(
+            (np.ones(known.sum(), dtype=np.int32), (movies[known], self.codes[known])),
+            shape=(len(people), len(self.names)),
+        )
+        self.matrix.data[:] = 1
+        # Rank of every name in alphabetical order
+        self._ranks = np.empty(len(self.names), dtype=np.int64)
+        self._ranks[np.argsort(self.names)] = np.arange(len(self.names))
+
+    def top(self, rows, count):
+        """
+        IDs of the `count` people credited the most in the movies at positions `rows`,
+        ties in order of first credit (as value_counts() on the melted columns).
+        """
+        codes = self.codes[:, rows].ravel()
+        codes = codes[codes >= 0]
+        people = pd.unique(codes)
+        credits = pd.Series(np.bincount(codes, minlength=len(self.names))[people], index=people)
+        return credits.sort_values(ascending=False).head(count).index.to_numpy()
+
+    def graph(self, rows, people):
+        """
+        Collaborations between `people` (IDs) in the movies at positions `rows`: an edge per pair of them
+        sharing movies, weighted by their number. Edges are added in order of the names, which layouts depend on.
+        """
+        incidence = self.matrix[rows][:, people]
+        shared = (incidence.T @ incidence).tocoo()
+        pairs = shared.row != shared.col
+        first, second = people[shared.row[pairs]], people[shared.col[pairs]]
+        order = np.lexsort((self._ranks[second], self._ranks[first]))
+        G = nx.Graph()
+        G.add_weighted_edges_from(zip(
+            self.names[first[order]], self.names[second[order]], shared.data[pairs][order].tolist(),
+        ))
+        return G
+
+
+DirectorActorNetwork = namedtuple('DirectorActorNetwork', ['people', 'is_director', 'degrees', 'edges', 'movies'])
+
+
+class DirectorActorIndex:
+    """
+    Director–actor credits of the movies, coded once as integer IDs over one vocabulary of people
+    (directors also act), with the number of movies of every director, so the network of the directors
+    having at least `min_movies` movies is a selection of the precomputed credits.
+    """
+
+    def __init__(self, directors, actors):
+        # Per movie, its director then its actors: the order in which the network meets people
+        people = np.column_stack([directors.to_numpy(dtype=object), actors.to_numpy(dtype=object)])
+        codes, self.names = pd.factorize(people.ravel())
+        self.codes = codes.reshape(people.shape)
+        directors = self.codes[:, 0]
+        movies = np.bincount(directors[directors >= 0], minlength=len(self.names))
+        self.director_movies = np.where(directors >= 0, movies[directors], 0)
+
+    def network(self, min_movies):
+        """
+        Bipartite network of the directors having at least `min_movies` movies (and `min_movies` collaborators)
+        and of the actors working with two of them or more:
+
+        - people: IDs of the nodes in order of first credit, is_director: whether a node was first met as
+          a director, degrees: number of collaborators of each node (directing oneself counts twice)
+        - edges: (first, second) ID arrays, in order of first credit, and movies: the row of the last movie of each
+        """
+        n_people = len(self.names)
+        rows = np.flatnonzero(self.director_movies >= min_movies)
+        codes = self.codes[rows]
+        credits = codes.ravel()
+        roles = np.tile(np.arange(codes.shape[1]) == 0, len(rows))
+        credited = credits >= 0
+        people, first = np.unique(credits[credited], return_index=True)
+        order = np.argsort(first)
+        people, is_director = people[order], roles[credited][first[order]]
+
+        directors = np.repeat(codes[:, 0], codes.shape[1] - 1)
+        actors = codes[:, 1:].ravel()
+        movies = np.repeat(rows, codes.shape[1] - 1)
+        credited = actors >= 0
+        directors, actors, movies = directors[credited], actors[credited], movies[credited]
+        first, second = np.minimum(directors, actors), np.maximum(directors, actors)
+        pairs, unique_pairs = pd.factorize(first * n_people + second)
+        last = np.full(len(unique_pairs), -1, dtype=np.int64)
+        np.maximum.at(last, pairs, np.arange(len(pairs)))
+        first, second, movies = unique_pairs // n_people, unique_pairs % n_people, movies[last]
+
+        def degrees():
+            edges = kept[first] & kept[second]
+            counts = np.bincount(first[edges], minlength=n_people) + np.bincount(second[edges], minlength=n_people)
+            return edges, counts
+
+        # Directors with too few collaborators go first, then actors left working with a single director
+        kept = np.zeros(n_people, dtype=bool)
+        kept[people] = True
+        director = np.zeros(n_people, dtype=bool)
+        director[people[is_director]] = True
+        _, counts = degrees()
+        kept &= ~(director & (counts < min_movies))
+        _, counts = degrees()
+        kept &= ~(~director & (counts < 2))
+        edges, counts = degrees()
+        nodes = kept[people]
+        return DirectorActorNetwork(
+            people[nodes], is_director[nodes], counts[people[nodes]], (first[edges], second[edges]), movies[edges],
+        )
+
+    def hover_text(self, network, titles):
+        """
+        Hover text of every node of a `network`: its name, its number of collaborators, then every collaboration
+        (movie - collaborator) in the order they were met. `titles` are the titles of the movies, by row.
+        """
+        names = self.names[network.people]
+        first, second = self.names[network.edges[0]], self.names[network.edges[1]]
+        movies = titles[network.movies]
+        lines = pd.DataFrame({
+            'node': np.concatenate([first, second]),
+            'line': '- ' + np.concatenate([movies, movies]) + ' - ' + np.concatenate([second, first]),
+            'order': np.tile(np.arange(len(first)), 2),
+        })
+        # A director acting in their own movie is listed once
+        lines = lines[~lines.duplicated(['node', 'order'])]
+        lines = lines.sort_values('order', kind='stable').groupby('node', sort=False)['line'].agg('<br>'.join)
+        return (
+            names + ' (' + network.degrees.astype(str) + ' connections)<br>' + lines.reindex(names, fill_value='').to_numpy()
+        ).tolist()
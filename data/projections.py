@@ -0,0 +1,146 @@
+import copy
+import hashlib
+import threading
+
+import numpy as np
+from sklearn.decomposition import IncrementalPCA, TruncatedSVD
+from sklearn.preprocessing import StandardScaler
+
+# Rows per partial_fit call when fitting a model
+FIT_CHUNK = 65536
+
+
+def modelKey(*parts):
+    """
+    Short hash of this module's code and of `parts`, in the names of the persisted models: the dataset
+    version does not change with the features or the code they are fitted with.
+    """
+    digest = hashlib.sha256()
+    with open(__file__, 'rb') as f:
+        digest.update(f.read())
+    for part in parts:
+        digest.update(repr(part).encode())
+    return digest.hexdigest()[:12]
+
+
+def fitChunks(n_rows, size=FIT_CHUNK):
+    """
+    Row slices of about `size` rows covering n_rows, without a short last chunk (IncrementalPCA needs
+    at least n_components rows per call).
+    """
+    bounds = np.linspace(0, n_rows, max(1, -(-n_rows // size)) + 1).astype(int)
+    return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+class ProjectionService:
+    """
+    Standardization and linear projections of some features of the dataset, for the pages plotting them.
+
+    The StandardScaler and the PCA models are fitted by chunks with partial_fit, so the fit streams over
+    large inputs, and they are dataset artifacts: fitted once per dataset version on the dataset's rows,
+    then read back from the dataset cache by later starts, under names keyed on the feature names and this
+    module's code. Each service works on its own copy of them, which add_rows() updates with new rows
+    instead of refitting. Projections are computed on first use and memoized.
+    """
+
+    def __init__(self, store, name, feature_names):
+        self.store = store
+        self.name = name
+        self.feature_names = list(feature_names)
+        self.features = store.frame()[self.feature_names].to_numpy(dtype=np.float64)
+        self.dataset_rows = len(self.features)
+        self.model_key = modelKey(self.feature_names)
+        self._models = {}
+        self._projections = {}
+        # Projections build on each other (PCA on the standardized features)
+        self._lock = threading.RLock()
+
+    def _memo(self, key, compute):
+        with self._lock:
+            if key not in self._projections:
+                self._projections[key] = compute()
+            return self._projections[key]
+
+    def _model(self, key, artifact, update=None):
+        with self._lock:
+            if key not in self._models:
+                # The store's model is shared by the whole process and stays the one of the dataset
+                model = copy.deepcopy(artifact())
+                if update is not None:
+                    update(model)
+                self._models[key] = model
+            return self._models[key]
+
+    def _dataset_scaler(self):
+        def fit():
+            scaler = StandardScaler()
+            for rows in fitChunks(self.dataset_rows):
+                scaler.partial_fit(self.features[rows])
+            return scaler
+        return self.store.artifact(f'{self.name}.scaler.{self.model_key}', fit)
+
+    def scaler(self):
+        return self._model(('scaler',), self._dataset_scaler)
+
+    def scaled(self):
+        """
+        Standardized features.
+        """
+        return self._memo(('scaled',), lambda: self.scaler().transform(self.features))
+
+    def pca_model(self, n_components=2):
+        def fit():
+            scaled = self._dataset_scaler().transform(self.features[:self.dataset_rows])
+            pca = IncrementalPCA(n_components=n_components)
+            for rows in fitChunks(len(scaled)):
+                pca.partial_fit(scaled[rows])
+            return pca
+
+        def add_rows(pca):
+            # Loaded after add_rows(): the added rows are folded in as they would have been
+            if len(self.features) > self.dataset_rows:
+                pca.partial_fit(self.scaled()[self.dataset_rows:])
+
+        return self._model(('pca', n_components), lambda: self.store.artifact(
+            f'{self.name}.pca{n_components}.{self.model_key}', fit,
+        ), add_rows)
+
+    def pca(self, n_components=2):
+        """
+        Coordinates of the standardized features on their first n_components principal axes. When the
+        dataset fits in one chunk, the axes are the ones of an exact PCA.
+        """
+        return self._memo(('pca', n_components), lambda: self.pca_model(n_components).transform(self.scaled()))
+
+    def genre_svd(self, n_components=2):
+        """
+        Coordinates of the movies of the dataset on the first n_components axes of their one-hot genres
+        (randomized SVD).
+        """
+        def fit():
+            return TruncatedSVD(n_components=n_components, algorithm='randomized', random_state=42).fit(
+                self.store.genres.matrix.astype(np.float64),
+            )
+
+        return self._memo(('genre_svd', n_components), lambda: self.store.artifact(
+            f'genres.svd{n_components}.{modelKey()}', fit,
+        ).transform(self.store.genres.matrix.astype(np.float64)))
+
+    def add_rows(self, features):
+        """
+        Append rows of features (at least n_components of them): they update the scaler and are folded into
+        the PCA models with partial_fit, and the projections are recomputed on the updated models. The PCA
+        models keep what they learnt from the previous rows, standardized as they were then, which differs
+        little while the added rows are few next to the dataset. Only this service's models are updated.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        with self._lock:
+            scaler = self.scaler()
+            scaler.partial_fit(features)
+            self.features = np.vstack([self.features, features])
+            scaled = scaler.transform(features)
+            for key, model in self._models.items():
+                if key[0] == 'pca':
+                    model.partial_fit(scaled)
+            for key in [key for key in self._projections if key[0] in ('scaled', 'pca')]:
+                del self._projections[key]
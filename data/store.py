@@ -0,0 +1,61 @@
+import threading
+
+from data import cache
+from data.genres import GenreIndex
+from data.loader import getDataset
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class DatasetStore:
+    """
+    Process-wide holder of the cleaned dataset.
+
+    The base frame is loaded and cleaned once, then handed out as read-only
+    views, so pages never mutate the shared frame. Indexes shared by the
+    pages (genres...) are built along with it.
+    Artifacts (fitted models...) are persisted with the dataset cache and read back by later starts.
+    """
+
+    def __init__(self, df):
+        self._base = df
+        self.version = df.attrs.get('version')
+        self.source = df.attrs.get('source')
+        self.genres = GenreIndex(df['Genre'])
+        self._artifacts = {}
+
+    def frame(self):
+        """
+        Return a read-only view of the base frame.
+        Assigning new columns on the result only affects the caller's view.
+        """
+        return self._base.copy(deep=False)
+
+    def artifact(self, name, build):
+        """
+        Return the artifact `name` of the dataset: memoized, else read from the dataset cache, else built
+        by calling `build()` and saved there.
+        """
+        if name not in self._artifacts:
+            artifact = None
+            if self.source is not None:
+                artifact = cache.readArtifact(self.source, self.version, name)
+            if artifact is None:
+                artifact = build()
+                if self.source is not None:
+                    cache.writeArtifact(self.source, self.version, name, artifact)
+            self._artifacts.setdefault(name, artifact)
+        return self._artifacts[name]
+
+    def __len__(self):
+        return len(self._base)
+
+
+def getStore():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DatasetStore(getDataset())
+    return _store
@@ -0,0 +1,35 @@
+# Production server: gunicorn -c gunicorn.conf.py
+#
+# The app is loaded once in the master (dataset, indexes, precomputed figures and clusterings), then the
+# workers are forked from it and share that memory copy-on-write. `kill -TERM` lets them finish their
+# requests before stopping.
+#
+# `kill -HUP <master pid>` replaces the workers gracefully, but forks them from the already loaded master:
+# code and data changes are not picked up. To deploy, restart gunicorn, or without downtime start a new
+# master with `kill -USR2 <master pid>` and stop the old one with `kill -TERM` once the new one is ready.
+import gc
+import multiprocessing
+import os
+
+wsgi_app = 'webdash.app:server'
+bind = os.environ.get('BIND', '0.0.0.0:8050')
+preload_app = True
+
+# Worker processes use the cores, threads overlap the requests of a worker waiting on I/O or numpy
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+
+# Building a network or a clustering that is not cached yet can take a while
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = 30
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded, before any worker is forked
+    from webdash.app import preload
+    server.log.info("Preloading figures and clusterings")
+    preload()
+    # Keep what the master loaded out of the workers' garbage collections: collecting it would write to
+    # its object headers, and so copy the pages shared with the master in every worker
+    gc.freeze()
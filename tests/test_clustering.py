@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN, KMeans
+from sklearn.neighbors import radius_neighbors_graph
+from sklearn.preprocessing import StandardScaler
+
+from data.clustering import ClusteringCache, neighborRadius
+from data.loader import getDataset
+
+FEATURES = ['Runtime', 'No_of_Votes', 'Gross', 'IMDB_Rating']
+EPS = [0.1, 0.3, 0.5, 0.8, 1.0, 1.5, 2.0, 3.0]
+MIN_SAMPLES = [2, 5, 10, 20]
+
+
+def sklearnLabels(features, eps, min_samples):
+    return DBSCAN(eps=eps, min_samples=min_samples).fit(features).labels_
+
+
+@pytest.fixture(scope='module')
+def movies():
+    df = getDataset(use_cache=False)
+    return StandardScaler().fit_transform(df[FEATURES].to_numpy(dtype=np.float64))
+
+
+@pytest.fixture(scope='module')
+def duplicated():
+    # Clusters of different densities, noise, and points repeated up to 4 times
+    rng = np.random.default_rng(0)
+    points = np.vstack([
+        rng.normal(0, 0.3, (150, 2)), rng.normal(3, 0.8, (150, 2)), rng.uniform(-4, 7, (60, 2)),
+    ])
+    return np.vstack([points, points[:80], points[:20], points[:20]])
+
+
+@pytest.mark.parametrize('min_samples', MIN_SAMPLES)
+def test_graph_labels_on_movies(movies, min_samples):
+    clusters = ClusteringCache('test', FEATURES, movies, neighbor_radius=3.0)
+    for eps in EPS:
+        np.testing.assert_array_equal(clusters.dbscan(eps, min_samples), sklearnLabels(movies, eps, min_samples))
+    assert clusters.neighbor_graph().radius == 3.0
+
+
+@pytest.mark.parametrize('min_samples', MIN_SAMPLES)
+def test_graph_labels_with_duplicates(duplicated, min_samples):
+    clusters = ClusteringCache('test', ['x', 'y'], duplicated, neighbor_radius=3.0)
+    for eps in EPS:
+        np.testing.assert_array_equal(clusters.dbscan(eps, min_samples), sklearnLabels(duplicated, eps, min_samples))
+
+
+@pytest.mark.parametrize('min_samples', [2, 5])
+def test_shrunken_radius_falls_back_to_dbscan(duplicated, min_samples):
+    clusters = ClusteringCache('test', ['x', 'y'], duplicated, neighbor_radius=3.0, neighbor_pairs=5000)
+    radius = clusters.neighbor_graph().radius
+    assert EPS[0] < radius < EPS[-1]
+    for eps in EPS:
+        np.testing.assert_array_equal(clusters.dbscan(eps, min_samples), sklearnLabels(duplicated, eps, min_samples))
+
+
+def test_neighbor_radius_budget(movies):
+    radius = neighborRadius(movies, 3.0, max_pairs=50000)
+    pairs = radius_neighbors_graph(movies, radius).nnz
+    assert radius < 3.0
+    assert 25000 < pairs < 100000
+    assert neighborRadius(movies, 3.0, max_pairs=len(movies) ** 2) == 3.0
+
+
+def test_sampled_dbscan(duplicated):
+    eps, min_samples = 0.5, 5
+    clusters = ClusteringCache('test', ['x', 'y'], duplicated, neighbor_radius=3.0, dbscan_rows=200)
+    labels = clusters.dbscan(eps, min_samples)
+    sample = clusters.dbscan_sample
+    assert len(sample) < len(duplicated)
+
+    # Sampled rows keep the labels of DBSCAN on the sample
+    fitted = DBSCAN(eps=eps, min_samples=min_samples).fit(duplicated[sample])
+    np.testing.assert_array_equal(labels[sample], fitted.labels_)
+
+    # Other rows join the cluster of their nearest core point within eps, or are noise
+    core = duplicated[sample][fitted.core_sample_indices_]
+    others = np.setdiff1d(np.arange(len(duplicated)), sample)
+    distances = np.linalg.norm(duplicated[others, None] - core[None], axis=2)
+    nearest = distances.argmin(axis=1)
+    expected = np.where(
+        distances.min(axis=1) <= eps, fitted.labels_[fitted.core_sample_indices_][nearest], -1,
+    )
+    np.testing.assert_array_equal(labels[others], expected)
+
+
+def test_kmeans_scores(movies):
+    clusters = ClusteringCache('test', FEATURES, movies)
+    scores = clusters.kmeans_scores(range(2, 6))
+    assert scores['n_clusters'] == [2, 3, 4, 5]
+    assert all(a > b for a, b in zip(scores['inertia'], scores['inertia'][1:]))
+    assert all(-1 <= silhouette <= 1 for silhouette in scores['silhouette'])
+    assert scores['inertia'][1] == pytest.approx(KMeans(n_clusters=3, random_state=42).fit(movies).inertia_)
+
+
+def test_warm_started_kmeans(movies):
+    clusters = ClusteringCache('test', FEATURES, movies)
+    warm = clusters.kmeans(5, warm_start=True)
+    assert warm.centers.shape == (5, len(FEATURES))
+    assert set(np.unique(warm.labels)) == set(range(5))
+    # A single run from the previous centroids, close to the best of the k-means++ runs
+    assert warm.inertia <= 1.2 * clusters.kmeans(5).inertia
+    # Each k was cached under its own warm-started key
+    assert clusters.kmeans(4, warm_start=True) is clusters.kmeans(4, warm_start=True)
+    assert clusters.kmeans(4, warm_start=True) is not clusters.kmeans(4)
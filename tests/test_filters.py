@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.filters import sortRanks, sortRows
+from data.loader import getDataset
+
+TABLE_COLUMNS = ['Series_Title', 'Director', 'Star1', 'Star2', 'Star3', 'Star4']
+
+
+def sortedValues(df, column, descending=False):
+    """
+    Values of `column` as ordered by sort_values, missing ones where sortRows puts them. Categoricals are
+    compared as values, sort_values would keep the order of their categories.
+    """
+    values = df[column].astype(object)
+    return values.sort_values(ascending=not descending, na_position='last' if descending else 'first').to_numpy()
+
+
+def assertSortedLike(df, column):
+    rows = np.arange(len(df))
+    ranks = sortRanks(df, [column])[column]
+    values = df[column].to_numpy(dtype=object)
+    for descending in (False, True):
+        pd.testing.assert_series_equal(pd.Series(values[sortRows(rows, ranks, descending)]),
+                                       pd.Series(sortedValues(df, column, descending)))
+
+
+def test_categories_in_order_of_appearance():
+    # As built by the dataset cache: categories are not sorted
+    names = ['Nolan', 'Fincher', None, 'Anderson', 'Nolan']
+    df = pd.DataFrame({'Director': pd.Categorical(names, categories=['Nolan', 'Fincher', 'Anderson'])})
+    assertSortedLike(df, 'Director')
+
+
+@pytest.mark.parametrize('column', TABLE_COLUMNS)
+def test_table_columns(column):
+    assertSortedLike(getDataset(use_cache=False), column)
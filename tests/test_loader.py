@@ -0,0 +1,15 @@
+import pandas as pd
+import pytest
+
+from data.loader import SCHEMA, cleanColumn
+
+
+def test_runtime_of_the_longest_titles():
+    values, missing = cleanColumn(pd.Series(['51420 min', None]), SCHEMA['Runtime'])
+    assert values.tolist() == [51420, 0]
+    assert missing == 1
+
+
+def test_narrowing_cast_out_of_range():
+    with pytest.raises(ValueError, match='int16'):
+        cleanColumn(pd.Series(['40000'], name='Released_Year'), SCHEMA['Released_Year'])
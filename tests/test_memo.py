@@ -0,0 +1,16 @@
+from webdash import background
+from webdash.memo import DiskcacheBackend
+
+
+def test_counters_outlive_the_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(background, 'CACHE_DIR', str(tmp_path))
+    backend = DiskcacheBackend(size_limit=2**16)
+    backend.count('figure', 'hits')
+    backend.count('figure', 'misses')
+    backend.count('figure', 'misses')
+    # Results well past the size limit, evicting the least recently used ones
+    for index in range(64):
+        backend.set(f'result:{index}', bytes(2**14))
+    assert not backend.has('result:0')
+    assert backend.counts('figure') == {'hits': 1, 'misses': 2}
+    assert backend.counts('table') == {'hits': 0, 'misses': 0}
@@ -0,0 +1,132 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.genres import GenreIndex
+from data.loader import getDataset
+from data.networks import CollaborationIndex, DirectorActorIndex
+
+ACTORS = ['Star1', 'Star2', 'Star3', 'Star4']
+
+
+def baselineActorGraph(df, genre):
+    """
+    Collaboration graph of the top 50 actors of a genre, as the networks page first built it.
+    """
+    df = df.assign(Genre=df['Genre'].str.split(', ')).explode('Genre')
+    df = df[df['Genre'].apply(lambda x: genre in x)]
+    actors_df = pd.melt(df, value_vars=ACTORS, value_name='Actor').dropna()
+    top_actors = actors_df['Actor'].value_counts().head(50).index.tolist()
+    collaborations = []
+    for _, row in df.iterrows():
+        movie_actors = set([row[col] for col in ACTORS if row[col] in top_actors])
+        collaborations.extend([(a1, a2) for a1 in movie_actors for a2 in movie_actors if a1 != a2])
+    edges_df = pd.DataFrame(collaborations, columns=['Actor1', 'Actor2'])
+    edges_df = edges_df.groupby(['Actor1', 'Actor2']).size().reset_index(name='Weight')
+    G = nx.Graph()
+    for _, row in edges_df.iterrows():
+        G.add_edge(row['Actor1'], row['Actor2'], weight=row['Weight'])
+    return G
+
+
+def baselineMovieGraph(df, min_movies):
+    """
+    Director–actor graph and hover text of its nodes, as the networks page first built them.
+    """
+    G = nx.Graph()
+    df = df.groupby('Director', observed=True).filter(lambda x: len(x) >= min_movies)
+    for _, row in df.iterrows():
+        movie = row['Series_Title']
+        director = row['Director']
+        actors = df.loc[df['Series_Title'] == movie, ACTORS].values[0]
+        if director not in G.nodes:
+            G.add_node(director, node_type='director')
+        for actor in actors:
+            if actor not in G.nodes:
+                G.add_node(actor, node_type='actor')
+            G.add_edge(director, actor, movie=movie)
+    G.remove_nodes_from([node for node, degree in dict(G.degree()).items()
+                         if degree < min_movies and G.nodes[node].get('node_type') == 'director'])
+    G.remove_nodes_from([node for node, degree in dict(G.degree()).items()
+                         if degree < 2 and G.nodes[node].get('node_type') == 'actor'])
+    node_text = [
+        node + f" ({G.degree[node]} connections)<br>" + "<br>".join([f"- {G.edges[edge]['movie']} - {edge[1]}"
+                                                                     for edge in G.edges(node)])
+        for node in G.nodes()
+    ]
+    return G, node_text
+
+
+@pytest.fixture(scope='module')
+def movies():
+    return getDataset(use_cache=False)
+
+
+@pytest.fixture
+def small():
+    # Directors acting in their own movies, shared actors and an actor credited twice
+    return pd.DataFrame([
+        ('Heat', 'Mann', 'Crime, Drama', 'Pacino', 'De Niro', 'Kilmer', 'Voight'),
+        ('Thief', 'Mann', 'Crime', 'Caan', 'Weld', 'Belushi', 'Nelson'),
+        ('Collateral', 'Mann', 'Crime, Thriller', 'Cruise', 'Foxx', 'Smith', 'Voight'),
+        ('Unforgiven', 'Eastwood', 'Drama, Western', 'Eastwood', 'Hackman', 'Freeman', 'Harris'),
+        ('Mystic River', 'Eastwood', 'Crime, Drama', 'Penn', 'Robbins', 'Bacon', 'Harris'),
+        ('Million Dollar Baby', 'Eastwood', 'Drama', 'Eastwood', 'Swank', 'Freeman', 'Freeman'),
+        ('Blood Work', 'Eastwood', 'Crime', 'Pacino', 'Freeman', 'Kilmer', 'Penn'),
+        ('The Insider', 'Mann', 'Drama', 'Pacino', 'Crowe', 'Plummer', 'Penn'),
+        ('Serpico', 'Lumet', 'Crime, Drama', 'Pacino', 'Prince', 'Bianchi', 'Ramos'),
+    ], columns=['Series_Title', 'Director', 'Genre'] + ACTORS)
+
+
+def assertSameActorGraph(df, genre):
+    expected = baselineActorGraph(df, genre)
+    collaborations = CollaborationIndex(df[ACTORS])
+    rows = GenreIndex(df['Genre']).rows([genre])
+    G = collaborations.graph(rows, collaborations.top(rows, 50))
+    assert list(G.nodes) == list(expected.nodes)
+    assert list(G.edges(data='weight')) == list(expected.edges(data='weight'))
+
+
+def assertSameMovieGraph(df, min_movies):
+    expected, expected_text = baselineMovieGraph(df, min_movies)
+    credits = DirectorActorIndex(df['Director'], df[ACTORS])
+    network = credits.network(min_movies)
+    names = credits.names[network.people]
+    assert names.tolist() == list(expected.nodes)
+    assert network.is_director.tolist() == [data == 'director' for _, data in expected.nodes(data='node_type')]
+    assert network.degrees.tolist() == [degree for _, degree in expected.degree()]
+    edges = zip(credits.names[network.edges[0]], credits.names[network.edges[1]])
+    assert {frozenset(edge) for edge in edges} == {frozenset(edge) for edge in expected.edges}
+    assert credits.hover_text(network, df['Series_Title'].to_numpy(dtype=object)) == expected_text
+
+
+@pytest.mark.parametrize('genre', ['Crime', 'Drama', 'Western'])
+def test_actor_graph_of_a_small_frame(small, genre):
+    assertSameActorGraph(small, genre)
+
+
+@pytest.mark.parametrize('genre', ['Drama', 'Action', 'Sci-Fi', 'Film-Noir'])
+def test_actor_graph_of_the_movies(movies, genre):
+    assertSameActorGraph(movies, genre)
+
+
+@pytest.mark.parametrize('min_movies', [1, 2, 3, 4])
+def test_movie_graph_of_a_small_frame(small, min_movies):
+    assertSameMovieGraph(small, min_movies)
+
+
+@pytest.mark.parametrize('min_movies', [2, 5, 14])
+def test_movie_graph_of_the_movies(movies, min_movies):
+    assertSameMovieGraph(movies, min_movies)
+
+
+def test_repeated_title_keeps_its_own_cast(small):
+    # The first version looked the cast up by title, crediting the cast of the first 'Heat' to both
+    df = pd.concat([small, small.iloc[[0]].assign(Director='Lumet', Star1='Caan')], ignore_index=True)
+    credits = DirectorActorIndex(df['Director'], df[ACTORS])
+    network = credits.network(2)
+    edges = {frozenset(edge) for edge in zip(credits.names[network.edges[0]], credits.names[network.edges[1]])}
+    assert {'Lumet', 'Caan'} in edges
+    expected, _ = baselineMovieGraph(df, 2)
+    assert 'Caan' not in expected
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import StandardScaler
+
+from data.loader import getDataset
+from data.projections import ProjectionService
+from data.store import DatasetStore
+
+FEATURES = ['Runtime', 'No_of_Votes', 'Gross', 'IMDB_Rating']
+
+
+@pytest.fixture
+def store():
+    df = getDataset(use_cache=False)
+    # Models are not persisted next to the dataset
+    df.attrs.pop('source')
+    return DatasetStore(df)
+
+
+def assertSameAxes(actual, expected):
+    # Principal axes are defined up to their sign
+    signs = np.sign((actual * expected).sum(axis=0))
+    np.testing.assert_allclose(actual * signs, expected, atol=1e-8)
+
+
+@pytest.mark.parametrize('n_components', [2, 3])
+def test_pca_of_a_single_chunk_is_exact(store, n_components):
+    projections = ProjectionService(store, 'test', FEATURES)
+    scaled = StandardScaler().fit_transform(projections.features)
+    np.testing.assert_allclose(projections.scaled(), scaled)
+    assertSameAxes(projections.pca(n_components), PCA(n_components).fit_transform(scaled))
+    assert projections.pca(n_components) is projections.pca(n_components)
+
+
+def test_genre_svd(store):
+    coordinates = ProjectionService(store, 'test', FEATURES).genre_svd(2)
+    assert coordinates.shape == (len(store), 2)
+    assert np.isfinite(coordinates).all()
+
+
+def test_add_rows_updates_the_service_models_only(store):
+    projections = ProjectionService(store, 'test', FEATURES)
+    projections.pca(2)
+    added = projections.features[:10] * 2
+    projections.add_rows(added)
+
+    everything = np.vstack([projections.features[:-10], added])
+    np.testing.assert_allclose(projections.scaler().mean_, everything.mean(axis=0))
+    assert projections.scaled().shape == (len(store) + 10, len(FEATURES))
+    assert projections.pca_model(2).n_samples_seen_ == len(store) + 10
+    assert projections.pca(2).shape == (len(store) + 10, 2)
+    # Loaded after the rows were added, and updated with them
+    assert projections.pca_model(3).n_samples_seen_ == len(store) + 10
+
+    fresh = ProjectionService(store, 'test', FEATURES)
+    assert fresh.pca_model(2).n_samples_seen_ == len(store)
+    assert fresh.pca_model(3).n_samples_seen_ == len(store)
+    np.testing.assert_allclose(fresh.scaler().mean_, fresh.features.mean(axis=0))
@@ -1,11 +1,26 @@
-from flask_caching import Cache
+import os
+
 from dash import Dash, html, dcc, page_registry, page_container
 import dash_bootstrap_components as dbc
 
+import pandas as pd
 import plotly.express as px
 
+from data.clustering import waitForFits
+from data.store import getStore
+from webdash.figures import registry
+from webdash.memo import cache
+from webdash.metrics import instrument
+
+# The pages read the shared frame of data.store through views: with copy-on-write, an in-place write
+# on a view copies the touched column instead of modifying the shared one
+pd.set_option('mode.copy_on_write', True)
+
 app = Dash(external_stylesheets=[dbc.themes.BOOTSTRAP], use_pages=True)
-cache = Cache(app.server, config={'CACHE_TYPE': 'SimpleCache'})
+# Callback results shared by the worker processes (see webdash.memo)
+cache.init_app(app.server)
+# Latency, payload and cache metrics of the callbacks, served on /metrics
+instrument(app.server)
 
 # the style arguments for the sidebar. We use position:fixed and a fixed width
 SIDEBAR_STYLE = {
@@ -55,5 +70,25 @@ content.style = CONTENT_STYLE
 app.layout = html.Div([dcc.Location(id="url"), sidebar, content])
 
 
-def startDashApp():
-    app.run(debug=True)
\ No newline at end of file
+# WSGI application served by gunicorn (see gunicorn.conf.py)
+server = app.server
+
+
+def preload():
+    """
+    Build what the pages compute in the background (figures, clusterings) and wait for it, so that workers
+    forked afterwards share it copy-on-write instead of computing it each.
+    """
+    registry.prewarm(getStore().version).join()
+    waitForFits()
+
+
+def startDashApp(prewarm=os.environ.get('PREWARM_FIGURES') == '1', debug=os.environ.get('DASH_DEBUG', '1') == '1'):
+    """
+    Development server: a single process, with the reloader and the debug tools unless DASH_DEBUG=0.
+    Production runs under gunicorn instead.
+    """
+    if prewarm:
+        # Build the pages' static figures in the background instead of on their first visit
+        registry.prewarm(getStore().version)
+    app.run(debug=debug)
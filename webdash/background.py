@@ -0,0 +1,50 @@
+import glob
+import hashlib
+import os
+
+import diskcache
+from dash import DiskcacheManager
+
+# Shared by every worker process of the host, so any of them can reuse what another one computed
+CACHE_DIR = os.environ.get('DASH_CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache'))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def codeVersion(packages=('data', 'webdash')):
+    """
+    Hash of the Python sources of the app's packages. Results cached on disk are keyed on it along with the
+    dataset version, so that a change of the code computing them (a figure builder, a callback...) is not
+    answered from results of the previous code, which would otherwise outlive restarts and reloads.
+    """
+    digest = hashlib.sha256()
+    for package in packages:
+        for path in sorted(glob.glob(os.path.join(ROOT, package, '**', '*.py'), recursive=True)):
+            digest.update(os.path.relpath(path, ROOT).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+CODE_VERSION = codeVersion()
+
+# Background callbacks run in their own process, leaving the request threads free
+manager = DiskcacheManager(diskcache.Cache(os.path.join(CACHE_DIR, 'background')))
+
+
+def resultCache(name, size_limit=256 * 2**20):
+    """
+    On-disk LRU cache of computed results (images, figures...), evicting the least recently used above `size_limit` bytes.
+    """
+    return diskcache.Cache(
+        os.path.join(CACHE_DIR, name),
+        eviction_policy='least-recently-used',
+        size_limit=size_limit,
+    )
+
+
+def counterCache(name):
+    """
+    On-disk counters shared by the worker processes. Unlike resultCache(), nothing is ever evicted from it.
+    """
+    return diskcache.Cache(os.path.join(CACHE_DIR, name), eviction_policy='none')
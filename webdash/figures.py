@@ -0,0 +1,70 @@
+import logging
+import threading
+
+from webdash.memo import cached, track
+
+logger = logging.getLogger(__name__)
+
+
+class FigureRegistry:
+    """
+    Named figure builders, run on first request and memoized per dataset version (and builder arguments).
+
+    Pages register their builders at import, which costs nothing: figures of a page nobody opens are never
+    built, and later visits get the memoized figure back. prewarm() builds them ahead in a background thread.
+    A figure built by one worker process is shared with the others through the callback cache.
+    """
+
+    def __init__(self):
+        self._builders = {}
+        self._prewarmed = {}
+        self._figures = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, prewarm=True):
+        """
+        Register a figure builder. Builders taking arguments (e.g. a selected genre) are prewarmed
+        with the argument tuples given as `prewarm`, if any.
+        """
+        track(name)
+
+        def decorator(builder):
+            self._builders[name] = builder
+            if prewarm is True:
+                self._prewarmed[name] = [()]
+            elif prewarm:
+                self._prewarmed[name] = list(prewarm)
+            return builder
+        return decorator
+
+    def get(self, name, version, *args):
+        key = (name, version, args)
+        if key in self._figures:
+            return self._figures[key]
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        # Concurrent first requests wait for a single build
+        with lock:
+            if key not in self._figures:
+                self._figures[key] = cached(name, version, args, lambda: self._builders[name](*args))
+        return self._figures[key]
+
+    def prewarm(self, version, names=None):
+        """
+        Build the registered figures (all prewarmed ones by default) in a background thread, returning it.
+        """
+        def build():
+            for name in names or list(self._prewarmed):
+                for args in self._prewarmed.get(name, [()]):
+                    try:
+                        self.get(name, version, *args)
+                    except Exception:
+                        logger.exception("prewarm of figure %s%r failed", name, args)
+
+        thread = threading.Thread(target=build, name='figure-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+
+registry = FigureRegistry()
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import plotly.graph_objects as go
+
+# Traces with more points than this are drawn with WebGL (Scattergl) rather than SVG
+WEBGL_THRESHOLD = 2000
+# Most edges drawn by a network figure, the lightest ones are pruned above it
+EDGE_BUDGET = int(os.environ.get('NETWORK_EDGE_BUDGET', 20000))
+
+
+def scatterTrace(points, **kwargs):
+    """
+    go.Scatter trace, or go.Scattergl above WEBGL_THRESHOLD points.
+    """
+    return (go.Scattergl if points > WEBGL_THRESHOLD else go.Scatter)(**kwargs)
+
+
+def nodePositions(G, pos):
+    """
+    Nodes of G in order and their positions as an (n × 2) array.
+    """
+    nodes = list(G)
+    return nodes, np.array([pos[node] for node in nodes], dtype=np.float64).reshape(len(nodes), 2)
+
+
+def edgeCoordinates(xy, first, second):
+    """
+    x and y arrays of the segments between the positions of nodes first[i] and second[i] (indexes into `xy`),
+    separated by NaN gaps (sent as nulls, which break the line), built by fancy indexing.
+    """
+    segments = np.full((len(first), 3, 2), np.nan)
+    segments[:, 0] = xy[first]
+    segments[:, 1] = xy[second]
+    return segments[:, :, 0].ravel(), segments[:, :, 1].ravel()
+
+
+def edgeTrace(G, nodes, xy, budget=EDGE_BUDGET, **line):
+    """
+    Line trace of the edges of G, given its nodes and their positions (see nodePositions). Above `budget`
+    edges, only the heaviest ones (edge attribute `weight`, 1 by default) are drawn.
+    """
+    index = {node: i for i, node in enumerate(nodes)}
+    edges = G.edges(data='weight', default=1)
+    first = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+    second = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+    if len(first) > budget:
+        weights = np.fromiter((weight for _, _, weight in edges), dtype=np.float64, count=len(edges))
+        kept = np.sort(np.argsort(-weights, kind='stable')[:budget])
+        first, second = first[kept], second[kept]
+    x, y = edgeCoordinates(xy, first, second)
+    return scatterTrace(len(x), x=x, y=y, line=line, hoverinfo='none', mode='lines')
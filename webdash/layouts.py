@@ -0,0 +1,129 @@
+import hashlib
+import threading
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+from webdash.background import CODE_VERSION, resultCache
+
+# Graphs with this many nodes or more are laid out by forceLayout() instead of nx.spring_layout
+LARGE_GRAPH = 500
+# Force iterations when most nodes start from a previous layout
+WARM_ITERATIONS = 20
+
+
+def graphFingerprint(G):
+    """
+    Digest of the nodes and weighted edges of a graph, in order (layouts depend on the order of the nodes).
+    """
+    digest = hashlib.sha1()
+    digest.update(repr(list(G.nodes)).encode())
+    digest.update(repr(list(G.edges(data='weight'))).encode())
+    return digest.hexdigest()
+
+
+def forceLayout(adjacency, initial, k=None, iterations=50, grid=16, chunk=4096):
+    """
+    Fruchterman–Reingold layout of a sparse graph, vectorized with NumPy, from `initial` positions (n × 2).
+
+    Attraction runs along the edges only. Repulsion is approximated Barnes–Hut style: every node is
+    repelled by the centers of mass of the cells of a grid, instead of by every other node, so an
+    iteration costs O(edges + nodes × cells) rather than O(nodes²).
+    """
+    n = adjacency.shape[0]
+    pos = np.array(initial, dtype=np.float64)
+    if k is None:
+        k = 1 / np.sqrt(n)
+    edges = sparse.triu(adjacency, k=1).tocoo()
+    weights = edges.data.astype(np.float64)
+    temperature = 0.1 * max(np.ptp(pos, axis=0).max(), 1e-9)
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        lo, span = pos.min(axis=0), np.maximum(np.ptp(pos, axis=0), 1e-9)
+        cells = np.minimum(((pos - lo) / span * grid).astype(np.int64), grid - 1)
+        cell = cells[:, 0] * grid + cells[:, 1]
+        mass = np.bincount(cell, minlength=grid * grid).astype(np.float64)
+        centers = np.column_stack([np.bincount(cell, pos[:, d], minlength=grid * grid) for d in (0, 1)])
+        occupied = mass > 0
+        centers[occupied] /= mass[occupied, None]
+
+        # Repulsion from every occupied cell, then the node's own cell without the node itself
+        displacement = np.zeros_like(pos)
+        for start in range(0, n, chunk):
+            delta = pos[start:start + chunk, None, :] - centers[None, occupied, :]
+            distance2 = np.maximum((delta ** 2).sum(axis=2), 1e-4)
+            repulsion = k * k * mass[occupied] / distance2
+            displacement[start:start + chunk] = (delta * repulsion[:, :, None]).sum(axis=1)
+        own_mass, own_center = mass[cell], centers[cell]
+        delta = pos - own_center
+        displacement -= delta * (k * k * own_mass / np.maximum((delta ** 2).sum(axis=1), 1e-4))[:, None]
+        shared = own_mass > 1
+        rest_mass = own_mass[shared] - 1
+        delta = pos[shared] - (own_center[shared] * own_mass[shared, None] - pos[shared]) / rest_mass[:, None]
+        displacement[shared] += delta * (k * k * rest_mass / np.maximum((delta ** 2).sum(axis=1), 1e-4))[:, None]
+
+        # Attraction along the edges
+        delta = pos[edges.row] - pos[edges.col]
+        force = delta * (np.sqrt((delta ** 2).sum(axis=1)) * weights / k)[:, None]
+        np.add.at(displacement, edges.row, -force)
+        np.add.at(displacement, edges.col, force)
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-2)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    pos -= pos.mean(axis=0)
+    return pos / max(np.abs(pos).max(), 1e-9)
+
+
+class LayoutService:
+    """
+    Node positions of the network figures, cached per graph fingerprint (and code version) in an on-disk
+    LRU cache shared by the workers.
+
+    A graph of a known `family` (actors, people...) starts from the positions its nodes had in the last
+    layout of the family, so overlapping graphs (e.g. the networks of two genres) look alike and take
+    fewer iterations. Large graphs are laid out by forceLayout() instead of nx.spring_layout.
+    """
+
+    def __init__(self, cache=None, large_graph=LARGE_GRAPH):
+        self.cache = cache
+        self.large_graph = large_graph
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def positions(self, G, family=None, k=0.5, seed=42):
+        key = ('layout', CODE_VERSION, graphFingerprint(G), k, seed)
+        pos = self.cache.get(key) if self.cache is not None else None
+        if pos is None:
+            pos = self._layout(G, family, k, seed)
+            if self.cache is not None:
+                self.cache.set(key, pos)
+        if family is not None:
+            with self._lock:
+                self._last.setdefault(family, {}).update(pos)
+        return pos
+
+    def _layout(self, G, family, k, seed):
+        with self._lock:
+            last = self._last.get(family, {})
+            initial = {node: last[node] for node in G if node in last}
+        warm = len(initial) > len(G) // 2
+        iterations = WARM_ITERATIONS if warm else 50
+
+        if len(G) < self.large_graph:
+            return nx.spring_layout(G, pos=initial or None, k=k, seed=seed, iterations=iterations)
+
+        nodes = list(G)
+        start = np.random.default_rng(seed).uniform(-1, 1, (len(nodes), 2))
+        for i, node in enumerate(nodes):
+            if node in initial:
+                start[i] = initial[node]
+        adjacency = nx.to_scipy_sparse_array(G, nodelist=nodes, weight='weight', format='csr')
+        pos = forceLayout(adjacency, start, k=k, iterations=iterations)
+        return dict(zip(nodes, pos))
+
+
+layouts = LayoutService(resultCache('layouts'))
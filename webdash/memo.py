@@ -0,0 +1,147 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+
+from flask_caching import Cache
+from flask_caching.backends.base import BaseCache
+
+from data.store import getStore
+from webdash.background import CODE_VERSION, counterCache, resultCache
+
+logger = logging.getLogger(__name__)
+
+# Bytes of callback results kept on disk, the least recently used ones are evicted above it
+CALLBACK_CACHE_SIZE = int(os.environ.get('CALLBACK_CACHE_SIZE', 512 * 2**20))
+
+
+class DiskcacheBackend(BaseCache):
+    """
+    Flask-Caching backend on the on-disk LRU cache of resultCache(): shared by every worker process of the
+    host and bounded in size, the least recently read entries being evicted first (FileSystemCache evicts
+    the oldest written ones instead). inc() is atomic across processes.
+
+    count() and counts() keep hit and miss counters in a cache of their own, out of reach of the eviction.
+    """
+
+    def __init__(self, name='callbacks', size_limit=CALLBACK_CACHE_SIZE, default_timeout=0):
+        super().__init__(default_timeout=default_timeout)
+        self._cache = resultCache(name, size_limit=size_limit)
+        self._counters = counterCache(f'{name}-stats')
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        return cls(*args, **kwargs)
+
+    def _expire(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return timeout or None
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, timeout=None):
+        return self._cache.set(key, value, expire=self._expire(timeout))
+
+    def add(self, key, value, timeout=None):
+        return self._cache.add(key, value, expire=self._expire(timeout))
+
+    def delete(self, key):
+        return self._cache.delete(key)
+
+    def has(self, key):
+        return key in self._cache
+
+    def clear(self):
+        self._cache.clear()
+        return True
+
+    def inc(self, key, delta=1):
+        return self._cache.incr(key, delta)
+
+    def dec(self, key, delta=1):
+        return self._cache.decr(key, delta)
+
+    def count(self, name, event):
+        return self._counters.incr(f"{name}:{event}")
+
+    def counts(self, name, events=('hits', 'misses')):
+        return {event: self._counters.get(f"{name}:{event}", 0) for event in events}
+
+
+# Bound to the Flask server by webdash.app. Until then (pages imported on their own), nothing is cached.
+cache = Cache(config={
+    'CACHE_TYPE': 'webdash.memo.DiskcacheBackend',
+    'CACHE_DEFAULT_TIMEOUT': 0,
+    'CACHE_OPTIONS': {'size_limit': CALLBACK_CACHE_SIZE},
+})
+
+# Names of the memoized results, for stats()
+_names = set()
+
+
+def track(name):
+    """
+    Declare a memoized name, so that stats() reports it before its first use in this process.
+    """
+    _names.add(name)
+
+
+def cacheKey(name, version, args):
+    """
+    Key of the result of `name` for the given arguments (callback inputs: JSON values), dataset version
+    and version of the code.
+    """
+    digest = hashlib.sha1(json.dumps(args, sort_keys=True, default=repr).encode()).hexdigest()
+    return f"{name}:{version}:{CODE_VERSION}:{digest}"
+
+
+def cached(name, version, args, compute):
+    """
+    Result of compute(), shared with every worker through the callback cache: read back when any worker
+    already computed `name` with these arguments for this dataset and code. Hits and misses are counted per name.
+    """
+    track(name)
+    if getattr(cache, 'app', None) is None:
+        return compute()
+    try:
+        key = cacheKey(name, version, args)
+        result = cache.get(key)
+        cache.cache.count(name, 'misses' if result is None else 'hits')
+    except Exception:
+        # A broken cache entry or directory costs a recomputation, not the request
+        logger.exception("callback cache read of %s failed", name)
+        return compute()
+    if result is not None:
+        return result
+    result = compute()
+    try:
+        cache.set(key, result)
+    except Exception:
+        logger.exception("callback cache write of %s failed", name)
+    return result
+
+
+def memoize(name):
+    """
+    Memoize a callback (or any function of JSON-like arguments) across the worker processes, keyed on its
+    arguments, the dataset version and the code version (see cached()). Callbacks reading dash.ctx must not be memoized.
+    """
+    track(name)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args):
+            return cached(name, getStore().version, args, lambda: function(*args))
+        return wrapper
+    return decorator
+
+
+def stats():
+    """
+    Hits and misses of the callback cache per memoized name, counted by every worker.
+    """
+    if getattr(cache, 'app', None) is None:
+        return {}
+    return {name: cache.cache.counts(name) for name in sorted(_names)}
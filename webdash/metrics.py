@@ -0,0 +1,237 @@
+import bisect
+import cProfile
+import functools
+import glob
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import dash
+import psutil
+from flask import Response, g, has_request_context, request
+
+from webdash import memo
+from webdash.background import CACHE_DIR
+
+# Every process writes its metrics there, the endpoint adds up those of all the workers
+METRICS_DIR = os.path.join(CACHE_DIR, 'metrics')
+PROFILE_DIR = os.path.join(CACHE_DIR, 'profiles')
+# Fraction of the callback requests run under cProfile, their profiles are saved in PROFILE_DIR
+PROFILE_RATE = float(os.environ.get('METRICS_PROFILE_RATE', 0))
+# Seconds between two writes of the metrics of a process, by a thread of its own
+FLUSH_INTERVAL = 5
+# Input combinations tracked per callback, the next ones are counted as "other"
+MAX_INPUT_COMBINATIONS = 50
+INPUTS_LABEL_LENGTH = 120
+
+SECONDS_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+BYTES_BUCKETS = [1e3, 1e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7]
+HISTOGRAMS = {
+    'dash_callback_duration_seconds': ("Wall time of the callback requests.", SECONDS_BUCKETS),
+    'dash_callback_cpu_seconds': ("CPU time of the callback requests.", SECONDS_BUCKETS),
+    'dash_callback_compute_seconds': ("Wall time in the callback function.", SECONDS_BUCKETS),
+    'dash_callback_serialization_seconds': (
+        "Wall time of the callback requests outside the callback function, mostly serializing its output.",
+        SECONDS_BUCKETS,
+    ),
+    'dash_callback_response_bytes': ("Size of the callback responses.", BYTES_BUCKETS),
+}
+
+
+class CallbackMetrics:
+    """
+    Histograms of the callback requests of a process, per callback and input combination.
+
+    Each process writes them to METRICS_DIR every FLUSH_INTERVAL seconds when they changed, and render() adds
+    up the files of every process, so the endpoint reports the whole server whichever worker answers it.
+    """
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self._series = {}
+        self._inputs = {}
+        self._dirty = False
+        self._flusher_pid = None
+        self._lock = threading.Lock()
+
+    def inputs_label(self, callback, inputs):
+        label = json.dumps(inputs, sort_keys=True, default=str)[:INPUTS_LABEL_LENGTH]
+        with self._lock:
+            seen = self._inputs.setdefault(callback, set())
+            if label not in seen and len(seen) >= MAX_INPUT_COMBINATIONS:
+                return 'other'
+            seen.add(label)
+        return label
+
+    def observe(self, metric, labels, value):
+        buckets = HISTOGRAMS[metric][1]
+        with self._lock:
+            counts, total = self._series.get((metric, labels), ([0] * (len(buckets) + 1), 0))
+            counts[bisect.bisect_left(buckets, value)] += 1
+            self._series[metric, labels] = (counts, total + value)
+            self._dirty = True
+            # Started in each worker process, threads do not survive a fork
+            if self._flusher_pid != os.getpid():
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._flush_periodically, name='metrics-flush', daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            if self._dirty:
+                self.flush()
+
+    def flush(self):
+        """
+        Write the metrics of this process.
+        """
+        with self._lock:
+            self._dirty = False
+            series = [[metric, list(labels), counts, total] for (metric, labels), (counts, total) in self._series.items()]
+        tmp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.metrics-', dir=self.directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(series, f)
+            os.replace(tmp_path, os.path.join(self.directory, f'{os.getpid()}.json'))
+        except OSError:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def prune(self):
+        """
+        Drop the metrics of the processes that are gone, e.g. the workers of a previous start.
+        """
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            pid = os.path.splitext(os.path.basename(path))[0]
+            if pid.isdigit() and not psutil.pid_exists(int(pid)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def merged(self):
+        series = {}
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for metric, labels, counts, total in snapshot:
+                if metric not in HISTOGRAMS:
+                    continue
+                previous_counts, previous_total = series.get((metric, tuple(labels)), ([0] * len(counts), 0))
+                series[metric, tuple(labels)] = (
+                    [a + b for a, b in zip(previous_counts, counts)], previous_total + total,
+                )
+        return series
+
+    def render(self):
+        """
+        Metrics of every process in the Prometheus text format, callback cache counters included.
+        """
+        self.flush()
+        series = self.merged()
+        lines = []
+        for metric, (description, buckets) in HISTOGRAMS.items():
+            lines += [f'# HELP {metric} {description}', f'# TYPE {metric} histogram']
+            for (name, labels), (counts, total) in sorted(series.items()):
+                if name != metric:
+                    continue
+                label_text = f'callback="{escape(labels[0])}",inputs="{escape(labels[1])}"'
+                cumulative = 0
+                for bound, count in zip(buckets + ['+Inf'], counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{label_text}}} {total}')
+                lines.append(f'{metric}_count{{{label_text}}} {cumulative}')
+
+        cache_stats = memo.stats()
+        for outcome in ('hits', 'misses'):
+            metric = f'dash_cache_{outcome}_total'
+            lines += [f'# HELP {metric} Callback cache {outcome}, counted by every worker.', f'# TYPE {metric} counter']
+            lines += [f'{metric}{{name="{escape(name)}"}} {counts[outcome]}' for name, counts in cache_stats.items()]
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = CallbackMetrics()
+
+
+def callback(*args, name=None, **kwargs):
+    """
+    dash.callback, timing the callback function (and profiling it on sampled requests) for the metrics
+    recorded by instrument(). Outside of a request (background callbacks, benchmarks), nothing is recorded.
+    Metrics are labelled with `name`, by default the name of the function.
+    """
+    register = dash.callback(*args, **kwargs)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def instrumented(*values, **options):
+            if not has_request_context() or 'metrics_start' not in g:
+                return function(*values, **options)
+            g.callback_name = name or function.__name__
+            start = time.perf_counter()
+            try:
+                if g.get('profiler') is not None:
+                    return g.profiler.runcall(function, *values, **options)
+                return function(*values, **options)
+            finally:
+                g.compute_seconds = time.perf_counter() - start
+        return register(instrumented)
+    return decorator
+
+
+def _before_request():
+    if not request.path.endswith('/_dash-update-component'):
+        return
+    g.metrics_start = time.perf_counter()
+    g.metrics_cpu = time.thread_time()
+    if PROFILE_RATE and random.random() < PROFILE_RATE:
+        g.profiler = cProfile.Profile()
+
+
+def _after_request(response):
+    if 'metrics_start' not in g:
+        return response
+    duration = time.perf_counter() - g.metrics_start
+    cpu = time.thread_time() - g.metrics_cpu
+    body = request.get_json(silent=True) or {}
+    name = g.get('callback_name') or body.get('output', 'unknown')
+    labels = (name, metrics.inputs_label(name, [value.get('value') for value in body.get('inputs', [])
+                                               if isinstance(value, dict)]))
+    size = response.calculate_content_length()
+    if size is None and not response.is_streamed:
+        size = len(response.get_data())
+
+    metrics.observe('dash_callback_duration_seconds', labels, duration)
+    metrics.observe('dash_callback_cpu_seconds', labels, cpu)
+    if 'compute_seconds' in g:
+        metrics.observe('dash_callback_compute_seconds', labels, g.compute_seconds)
+        metrics.observe('dash_callback_serialization_seconds', labels, max(duration - g.compute_seconds, 0))
+    if size is not None:
+        metrics.observe('dash_callback_response_bytes', labels, size)
+
+    if g.get('profiler') is not None:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        g.profiler.dump_stats(os.path.join(PROFILE_DIR, f'{name}-{time.time_ns()}-{os.getpid()}.prof'))
+    return response
+
+
+def instrument(server):
+    """
+    Record the metrics of the callback requests of a Flask server and serve them on /metrics.
+    """
+    metrics.prune()
+    server.before_request(_before_request)
+    server.after_request(_after_request)
+    server.add_url_rule('/metrics', 'metrics', lambda: Response(metrics.render(), mimetype='text/plain; version=0.0.4'))
@@ -1,25 +1,30 @@
 import dash
-from dash import dcc, html, Input, Output , callback
+from dash import dcc, html, Input, Output
 import dash_bootstrap_components as dbc
-import plotly.express as px
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 import numpy as np
-from sklearn.cluster import DBSCAN
-from data.loader import getDataset
-from sklearn.decomposition import PCA
+from data.clustering import ClusteringCache
+from data.projections import ProjectionService
+from data.store import getStore
+from webdash.memo import memoize
+from webdash.metrics import callback
+from webdash.scatter import clusterScatter, pointDetail
 
 # Load Dataset
-df = getDataset()
-features = df[['Runtime', 'No_of_Votes', 'Gross', 'IMDB_Rating']]
-scaler = StandardScaler()
-scaled_features = scaler.fit_transform(features)
+store = getStore()
+# The scaler and the PCA are fitted once per dataset version and persisted with the dataset cache
+projections = ProjectionService(store, 'Clustering', ['Runtime', 'No_of_Votes', 'Gross', 'IMDB_Rating'])
+scaled_features = projections.scaled()
+df = store.frame()
 
-
-pca = PCA(n_components=2)
-pca_features = pca.fit_transform(scaled_features)
-df['PCA1'] = pca_features[:, 0]
-df['PCA2'] = pca_features[:, 1]
+# Every KMeans of the slider range is fitted in the background from startup, the slider only looks them up
+KMEANS_RANGE = range(2, 11)
+# DBSCAN neighborhoods up to the largest eps of the sliders (within a pair budget) are computed on the first
+# DBSCAN request and shared by both DBSCAN plots
+DBSCAN_MAX_EPS = 3.0
+clusters = ClusteringCache(
+    store.version, projections.feature_names, scaled_features, neighbor_radius=DBSCAN_MAX_EPS,
+)
+clusters.precompute(KMEANS_RANGE)
 
 # Initialize Dash App
 dash.register_page(__name__)
@@ -34,13 +39,14 @@ layout = dbc.Container([
             html.Label("Sélectionnez le nombre de clusters :"),
             dcc.Slider(
                 id='kmeans-slider',
-                min=2,
-                max=10,
+                min=KMEANS_RANGE[0],
+                max=KMEANS_RANGE[-1],
                 step=1,
                 value=3,
-                marks={i: str(i) for i in range(2, 11)}
+                marks={i: str(i) for i in KMEANS_RANGE}
             ),
-            dcc.Graph(id='kmeans-cluster-plot')
+            dcc.Graph(id='kmeans-cluster-plot'),
+            html.Div(id='kmeans-cluster-plot-detail')
         ], width=12)
     ]),
     html.Hr(), 
@@ -53,7 +59,7 @@ layout = dbc.Container([
                 dcc.Slider(
                     id='dbscan-eps-slider',
                     min=0.1,
-                    max=3.0,
+                    max=DBSCAN_MAX_EPS,
                     step=0.1,
                     value=0.5,
                     marks={round(i, 1): str(round(i, 1)) for i in np.arange(0.1, 3.1, 0.5)}
@@ -68,7 +74,8 @@ layout = dbc.Container([
                     marks={i: str(i) for i in range(2, 21)}
                 ),
             ]),
-            dcc.Graph(id='dbscan-cluster-plot')
+            dcc.Graph(id='dbscan-cluster-plot'),
+            html.Div(id='dbscan-cluster-plot-detail')
         ], width=12)
     ]),
     html.Hr(), 
@@ -81,7 +88,7 @@ layout = dbc.Container([
                 dcc.Slider(
                     id='dbscan-eps-slider',
                     min=0.1,
-                    max=3.0,
+                    max=DBSCAN_MAX_EPS,
                     step=0.1,
                     value=0.5,
                     marks={round(i, 1): str(round(i, 1)) for i in np.arange(0.1, 3.1, 0.5)}
@@ -96,7 +103,8 @@ layout = dbc.Container([
                     marks={i: str(i) for i in range(2, 21)}
                 ),
             ]),
-            dcc.Graph(id='dbscan-pca-plot')
+            dcc.Graph(id='dbscan-pca-plot'),
+            html.Div(id='dbscan-pca-plot-detail')
         ], width=12)
     ])
 ])
@@ -104,12 +112,12 @@ layout = dbc.Container([
     Output('kmeans-cluster-plot', 'figure'),
     Input('kmeans-slider', 'value')
 )
+@memoize('clustering.kmeans')
 def update_kmeans_clusters(n_clusters):
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    df['KMeans_Cluster'] = kmeans.fit_predict(scaled_features)
-    df['KMeans_Cluster'] = df['KMeans_Cluster'].astype(str)
-    fig = px.scatter_3d(
+    labels = clusters.kmeans(n_clusters).labels
+    fig = clusterScatter(
         df,
+        labels.astype(str),
         x='Runtime',
         y='Gross',
         z='No_of_Votes',
@@ -124,12 +132,12 @@ def update_kmeans_clusters(n_clusters):
     [Input('dbscan-eps-slider', 'value'),
     Input('dbscan-min-samples-slider', 'value')]
 )
+@memoize('clustering.dbscan')
 def update_dbscan_clusters(eps, min_samples):
-    dbscan = DBSCAN(eps=eps, min_samples=min_samples)
-    df['DBSCAN_Cluster'] = dbscan.fit_predict(scaled_features)
-    df['DBSCAN_Cluster'] = df['DBSCAN_Cluster'].apply(lambda x: 'Noise' if x == -1 else str(x))
-    fig = px.scatter_3d(
+    labels = clusters.dbscan(eps, min_samples)
+    fig = clusterScatter(
         df,
+        np.where(labels == -1, 'Noise', labels.astype(str)),
         x='Runtime',
         y='Gross',
         z='No_of_Votes',
@@ -144,17 +152,31 @@ def update_dbscan_clusters(eps, min_samples):
     [Input('dbscan-eps-slider', 'value'),
     Input('dbscan-min-samples-slider', 'value')]
 )
+@memoize('clustering.dbscan_pca')
 def update_dbscan_pca_clusters(eps, min_samples):
-    dbscan = DBSCAN(eps=eps, min_samples=min_samples)
-    df['DBSCAN_Cluster'] = dbscan.fit_predict(scaled_features)
-    df['DBSCAN_Cluster'] = df['DBSCAN_Cluster'].apply(lambda x: 'Noise' if x == -1 else str(x))
+    labels = clusters.dbscan(eps, min_samples)
+    pca_features = projections.pca(2)
 
-    fig = px.scatter(
-        df,
+    fig = clusterScatter(
+        df.assign(PCA1=pca_features[:, 0], PCA2=pca_features[:, 1]),
+        np.where(labels == -1, 'Noise', labels.astype(str)),
         x='PCA1',
         y='PCA2',
         color='DBSCAN_Cluster',
         title=f'DBSCAN Clustering with PCA (eps={eps}, min_samples={min_samples})',
         hover_data=['Runtime', 'IMDB_Rating', 'No_of_Votes', 'Gross', 'Genre'] 
     )
-    return fig
\ No newline at end of file
+    return fig
+
+
+# Scatter plots may only hold a sample of the movies, the details of a clicked one come from the server
+def show_point_detail(click_data):
+    return pointDetail(df, click_data)
+
+
+for graph_id in ['kmeans-cluster-plot', 'dbscan-cluster-plot', 'dbscan-pca-plot']:
+    callback(
+        Output(f'{graph_id}-detail', 'children'),
+        Input(graph_id, 'clickData'),
+        name=f'{graph_id}-detail',
+    )(show_point_detail)
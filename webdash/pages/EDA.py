@@ -1,59 +1,227 @@
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+import numpy as np
 import io
 import base64
 import dash
-from dash import html, dcc,callback, Input, Output
+from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
-from data.loader import getDataset
+from data.store import getStore
+from webdash.background import CODE_VERSION, manager, resultCache
+from webdash.figures import registry
+from webdash.metrics import callback
 import plotly.express as px
 
 # Load Dataset
-df = getDataset()
+store = getStore()
+df = store.frame()
 
-df['Genre'] = df['Genre'].fillna('Unknown')  
-expanded_df = df.assign(Genre=df['Genre'].str.split(', ')).explode('Genre')
-genre_counts = expanded_df['Genre'].value_counts().reset_index() 
-genre_counts.columns = ['Genre', 'Count']
+# Released year is a date rather than a measure, it is left out of the numeric features
+numeric_features = df.select_dtypes(include='number').columns.drop('Released_Year')
 
-numeric_cols = df.select_dtypes(include=['float64', 'int64', 'Int64'])
-corr_matrix = numeric_cols.corr()
+unique_genres = ['All'] + store.genres.vocabulary
 
+# Rendered pairplots (base64 PNG), keyed by dataset and code versions and feature set
+pairplots = resultCache('pairplots')
+# Above this number of movies the interactive pairplot shows a random sample of them
+SPLOM_POINT_BUDGET = 5000
 
-top_directors = df['Director'].value_counts().reset_index().head(10)
-top_directors.columns = ['Director', 'Count']
+# Figures are built by the registry on the first visit of the page, not at import
+@registry.register('eda.top_directors')
+def top_directors_figure():
+    top_directors = df['Director'].value_counts().reset_index().head(10)
+    top_directors.columns = ['Director', 'Count']
+    return px.bar(
+        top_directors,
+        x='Count',
+        y='Director',
+        orientation='h',
+        title="Top 10 des réalisateurs par nombre de films",
+        labels={'Count': 'Count', 'Director': 'Director'},
+        color_discrete_sequence=px.colors.qualitative.Bold
+    ).update_layout(
+        margin=dict(l=40, r=40, t=40, b=40),
+        height=500
+    )
 
-certificate_counts = df['Certificate'].value_counts().reset_index()
-certificate_counts.columns = ['Certificate', 'Count']
 
-df_years_genre = df.dropna(subset=["Released_Year", "Genre"])
-df_years_genre["Released_Year"] = pd.to_numeric(df_years_genre["Released_Year"], errors="coerce") 
-df_years_genre = df_years_genre.dropna(subset=["Released_Year"])
-df_years_genre["Released_Year"] = df_years_genre["Released_Year"].astype(int)
+@registry.register('eda.certificates')
+def certificates_figure():
+    certificate_counts = df['Certificate'].value_counts().reset_index()
+    certificate_counts.columns = ['Certificate', 'Count']
+    return px.bar(
+        certificate_counts,
+        x='Count',
+        y='Certificate',
+        orientation='h',
+        title="Distribution des Certificates",
+        labels={'Count': 'Count', 'Certificate': 'Certificate'},
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    ).update_layout(
+        margin=dict(l=40, r=40, t=40, b=40),
+        height=500
+    )
 
-genre_split = df["Genre"].str.split(", ").explode()
-genre_distribution = genre_split.groupby([df["Released_Year"], genre_split]).size().unstack(fill_value=0)
 
-df_genre_gross = df[["Genre", "Gross"]]  
-df_genre_gross = df_genre_gross.dropna(subset=["Gross"]) 
+@registry.register('eda.genres')
+def genres_figure():
+    genre_counts = store.genres.counts().reset_index()
+    genre_counts.columns = ['Genre', 'Count']
+    fig = px.bar(
+        genre_counts,
+        x='Count',
+        y='Genre',
+        orientation='h',
+        color='Genre',
+        labels={'Count': 'Count', 'Genre': 'Genre'}
+    )
+    fig.update_layout(margin=dict(l=40, r=40, t=40, b=80))
+    return fig
 
-unique_genres = sorted(set(genre.strip() for genres in df['Genre'].dropna() for genre in genres.split(', ')))
-unique_genres.insert(0, 'All')
-expanded_frame = df_genre_gross.assign(Genre=df_genre_gross["Genre"].str.split(", ")).explode("Genre")
 
-df['Released_Year'] = pd.to_numeric(df['Released_Year'], errors='coerce')
-avg_rating_per_year = df.groupby('Released_Year')['IMDB_Rating'].mean().reset_index()
-avg_rating_per_year = avg_rating_per_year.dropna().sort_values('Released_Year')
+@registry.register('eda.genre_trends')
+def genre_trends_figure():
+    genre_positions, genre_names = store.genres.explode()
+    genre_distribution = pd.Series(genre_names).groupby(
+        [df["Released_Year"].to_numpy()[genre_positions], genre_names]
+    ).size().unstack(fill_value=0).rename_axis(index='Released_Year', columns='Genre')
+    total_counts = genre_distribution.sum()
+    top_genres = total_counts.nlargest(5).index
+    top_genre_distribution = genre_distribution[top_genres]
+    fig = px.line(
+        top_genre_distribution,
+        x=top_genre_distribution.index,
+        y=top_genre_distribution.columns,
+        labels={"value": "Count", "index": "Year"},
+    )
 
-avg_gross_per_year = df.groupby('Released_Year')['Gross'].mean().reset_index()
-avg_gross_per_year = avg_gross_per_year.dropna().sort_values('Released_Year')
+    fig.update_layout(
+        legend_title="Genre",
+        xaxis_title="Year",
+        yaxis_title="Count",
+        legend=dict(orientation="v", yanchor="top", y=0.75,xanchor="left", x=1.05),
+        margin=dict(l=20, r=120, t=40, b=20)
+    )
 
-df_copy = df.copy()
+    return fig
+
+
+@registry.register('eda.average_gross')
+def average_gross_figure():
+    gross = df['Gross'].fillna(0)
+    average_gross = store.genres.sums(gross) / store.genres.sums(df['Gross'].notna())
+    average_gross = average_gross.rename_axis('Genre').sort_values(ascending=False)
+    fig = px.bar(
+        average_gross,
+        x=average_gross.index,
+        y=average_gross.values,
+        labels={"x": "Genre", "y": "Average Gross Revenue"},
+        color=average_gross.index,
+    )
+    fig.update_layout(
+        xaxis_title="Genre",
+        yaxis_title="Average Gross Revenue",
+        xaxis_tickangle=70,
+        margin=dict(l=20, r=20, t=40, b=100)
+    )
+    return fig
+
+
+@registry.register('eda.correlation')
+def correlation_figure():
+    corr_matrix = df[numeric_features].corr()
+    return px.imshow(
+        corr_matrix,
+        labels=dict(x="Features", y="Features", color="Correlation"),
+        x=corr_matrix.columns,
+        y=corr_matrix.columns,
+        color_continuous_scale='Viridis'
+    ).update_layout(margin=dict(l=40, r=40, t=40, b=40))
+
+
+@registry.register('eda.votes_gross')
+def votes_gross_figure():
+    df_scatter = df[['No_of_Votes', 'Gross']].dropna()
+    return px.scatter(
+        df_scatter,
+        x='No_of_Votes',
+        y='Gross',
+        title="Corrélation entre le nombre de votes et le revenu brut",
+        labels={'No_of_Votes': 'Number of Votes', 'Gross': 'Gross Revenue'},
+        trendline='ols',
+        color_discrete_sequence=['#636EFA']
+    ).update_layout(
+        margin=dict(l=40, r=40, t=40, b=40),
+        height=600
+    )
+
+
+@registry.register('eda.yearly', prewarm=False)
+def yearly_figures(selected_genre):
+    if selected_genre == 'All':
+        filtered_df = df
+    else:
+        filtered_df = df[store.genres.mask([selected_genre])]
+    avg_rating_per_year = (
+        filtered_df.groupby('Released_Year')['IMDB_Rating'].mean().reset_index()
+    ).dropna().sort_values('Released_Year')
+
+    avg_gross_per_year = (
+        filtered_df.groupby('Released_Year')['Gross'].mean().reset_index()
+    ).dropna().sort_values('Released_Year')
+    rating_fig = px.bar(
+        avg_rating_per_year,
+        x='Released_Year',
+        y='IMDB_Rating',
+        labels={'Released_Year': 'Year', 'IMDB_Rating': 'Average IMDb Rating'},
+        color_discrete_sequence=['#636EFA']
+    ).update_layout(xaxis=dict(tickangle=45), height=500)
+    gross_fig = px.bar(
+        avg_gross_per_year,
+        x='Released_Year',
+        y='Gross',
+        labels={'Released_Year': 'Year', 'Gross': 'Average Gross Revenue'},
+        color_discrete_sequence=['#EF553B']
+    ).update_layout(xaxis=dict(tickangle=45), height=500)
+    return rating_fig, gross_fig
+
+
+@registry.register('eda.splom', prewarm=False)
+def splom_figure(features):
+    """
+    WebGL scatter matrix of the features, drawn by the browser. Columns are sent as base64
+    typed arrays rather than JSON lists, decimated to SPLOM_POINT_BUDGET movies.
+    """
+    rows = np.arange(len(df))
+    if len(rows) > SPLOM_POINT_BUDGET:
+        rows = np.sort(np.random.default_rng(42).choice(rows, SPLOM_POINT_BUDGET, replace=False))
+    dimensions = [
+        {
+            'label': col,
+            'values': {
+                'dtype': 'f4',
+                'bdata': base64.b64encode(df[col].to_numpy(dtype=np.float32)[rows].tobytes()).decode('ascii'),
+            },
+        }
+        for col in features
+    ]
+    size = max(400, 200 * len(features))
+    return {
+        'data': [{
+            'type': 'splom',
+            'dimensions': dimensions,
+            'showupperhalf': False,
+            'diagonal': {'visible': False},
+            'marker': {'size': 3, 'color': '#636EFA', 'opacity': 0.6},
+        }],
+        'layout': {
+            'title': {'text': f"Pairplot interactif ({len(rows)} films sur {len(df)})"},
+            'height': size,
+            'dragmode': 'select',
+            'hovermode': 'closest',
+            'margin': dict(l=60, r=20, t=60, b=60),
+        },
+    }
 
-df_copy['Gross'] = df_copy['Gross'].astype(str).str.replace(',', '').astype(float, errors='ignore')
-df_copy['No_of_Votes'] = pd.to_numeric(df_copy['No_of_Votes'], errors='coerce')
-df_scatter = df_copy[['No_of_Votes', 'Gross']].dropna() 
 
 dash.register_page(__name__)
 layout = dbc.Container([
@@ -65,50 +233,28 @@ layout = dbc.Container([
             html.Label("Sélectionner les caractéristiques pour le Pairplot :"),
             dcc.Dropdown(
                 id='pairplot-features',
-                options=[{'label': col, 'value': col} for col in df.select_dtypes(include=['float64', 'int64']).columns],
-                value=list(df.select_dtypes(include=['float64', 'int64']).columns),
+                options=[{'label': col, 'value': col} for col in numeric_features],
+                value=list(numeric_features),
                 multi=True,
                 placeholder="Sélectionnez les caractéristiques numériques"
             ),
             html.Button("Générer un Pairplot", id="generate-pairplot", n_clicks=0, className="btn btn-primary mt-2"),
-            html.Div(id='pairplot-container', className="mt-4")
+            html.Button("Annuler", id="cancel-pairplot", n_clicks=0, disabled=True, className="btn btn-secondary mt-2 ms-2"),
+            html.Button("Pairplot interactif (WebGL)", id="generate-splom", n_clicks=0, className="btn btn-outline-primary mt-2 ms-2"),
+            html.Div(
+                html.Div("Veuillez sélectionner les caractéristiques et cliquer sur Générer un Pairplot", style={'color': 'red', 'font-weight': 'bold'}),
+                id='pairplot-container', className="mt-4"
+            ),
+            html.Div(id='splom-container', className="mt-4")
         ], width=12)
     ]),
-    html.Hr(), 
+    html.Hr(),
     dbc.Row([
         dbc.Col([
-            dcc.Graph(
-                id='top-directors-bar-plot',
-                figure=px.bar(
-                    top_directors,
-                    x='Count',
-                    y='Director',
-                    orientation='h',
-                    title="Top 10 des réalisateurs par nombre de films",
-                    labels={'Count': 'Count', 'Director': 'Director'},
-                    color_discrete_sequence=px.colors.qualitative.Bold
-                ).update_layout(
-                    margin=dict(l=40, r=40, t=40, b=40),
-                    height=500
-                )
-            )
+            dcc.Graph(id='top-directors-bar-plot')
         ], width=6),
         dbc.Col([
-            dcc.Graph(
-                id='certificate-bar-plot',
-                figure=px.bar(
-                    certificate_counts,
-                    x='Count',
-                    y='Certificate',
-                    orientation='h',
-                    title="Distribution des Certificates",
-                    labels={'Count': 'Count', 'Certificate': 'Certificate'},
-                    color_discrete_sequence=px.colors.qualitative.Pastel
-                ).update_layout(
-                    margin=dict(l=40, r=40, t=40, b=40),
-                    height=500
-                )
-            )
+            dcc.Graph(id='certificate-bar-plot')
         ], width=6)
     ]),
     html.Hr(),
@@ -129,29 +275,20 @@ layout = dbc.Container([
             dcc.Graph(id="genre-trends-plot"),
         ], width=12)
     ]),
-    html.Hr(), 
+    html.Hr(),
     dbc.Row([
         dbc.Col(html.H1("Revenu brut moyen par genre", className="text-center mb-4"), width=12)
     ]),
     dbc.Row([
         dbc.Col([
-            dcc.Graph(id="average-gross-plot") 
+            dcc.Graph(id="average-gross-plot")
         ], width=12)
     ]),
-    html.Hr(), 
+    html.Hr(),
 
     dbc.Row([
         dbc.Col([
-            dcc.Graph(
-                id='correlation-heatmap',
-                figure=px.imshow(
-                    corr_matrix,
-                    labels=dict(x="Features", y="Features", color="Correlation"),
-                    x=corr_matrix.columns,
-                    y=corr_matrix.columns,
-                    color_continuous_scale='Viridis'
-                ).update_layout(margin=dict(l=40, r=40, t=40, b=40))
-            )
+            dcc.Graph(id='correlation-heatmap')
         ], width=12)
     ]),
     html.Hr(),
@@ -160,24 +297,10 @@ layout = dbc.Container([
     ]),
     dbc.Row([
         dbc.Col([
-            dcc.Graph(
-                id='votes-gross-scatter',
-                figure=px.scatter(
-                    df_scatter,
-                    x='No_of_Votes',
-                    y='Gross',
-                    title="Corrélation entre le nombre de votes et le revenu brut",
-                    labels={'No_of_Votes': 'Number of Votes', 'Gross': 'Gross Revenue'},
-                    trendline='ols',  
-                    color_discrete_sequence=['#636EFA'] 
-                ).update_layout(
-                    margin=dict(l=40, r=40, t=40, b=40),
-                    height=600
-                )
-            )
+            dcc.Graph(id='votes-gross-scatter')
         ], width=12)
     ]),
-    html.Hr(), 
+    html.Hr(),
         dbc.Row([
         dbc.Col(html.H1("Note moyenne IMDb et revenu brut par année (par genre)", className="text-center mb-4"), width=12)
     ]),
@@ -187,7 +310,7 @@ layout = dbc.Container([
             dcc.Dropdown(
                 id='genre-dropdown',
                 options=[{'label': genre, 'value': genre} for genre in unique_genres],
-                value='All', 
+                value='All',
                 multi=False,
                 clearable=False
             )
@@ -203,91 +326,88 @@ layout = dbc.Container([
     ])
 ])
 
+def render_pairplot(features):
+    # Imported here, matplotlib and seaborn are only loaded by the processes drawing pairplots
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set(style="whitegrid")
+    plt.style.use('Solarize_Light2')
+    pairplot = sns.pairplot(df[features])
+    buf = io.BytesIO()
+    pairplot.savefig(buf, format='png')
+    plt.close(pairplot.figure)
+    encoded_image = base64.b64encode(buf.getvalue()).decode('utf-8')
+    buf.close()
+    return encoded_image
+
+
+def pairplot_image(selected_features):
+    """
+    Pairplot of the selected features as a base64 PNG, drawn once per feature set whatever their selection order.
+    """
+    features = [col for col in numeric_features if col in selected_features]
+    key = (store.version, CODE_VERSION, tuple(features))
+    encoded_image = pairplots.get(key)
+    if encoded_image is None:
+        encoded_image = render_pairplot(features)
+        pairplots.set(key, encoded_image)
+    return encoded_image
+
+
+# Drawn in a background process: the request thread is not blocked, and a new click or "Annuler" cancels it
 @callback(
     Output('pairplot-container', 'children'),
     Input('generate-pairplot', 'n_clicks'),
-    Input('pairplot-features', 'value')
+    State('pairplot-features', 'value'),
+    background=True,
+    manager=manager,
+    running=[
+        (Output('generate-pairplot', 'disabled'), True, False),
+        (Output('cancel-pairplot', 'disabled'), False, True),
+    ],
+    cancel=[Input('cancel-pairplot', 'n_clicks')],
+    prevent_initial_call=True
 )
 def update_pairplot(n_clicks, selected_features):
     if n_clicks > 0 and selected_features:
-        sns.set(style="whitegrid")
-        plt.style.use('Solarize_Light2')
-        pairplot = sns.pairplot(df[selected_features])
-        buf = io.BytesIO()
-        pairplot.savefig(buf, format='png')
-        buf.seek(0)
-        encoded_image = base64.b64encode(buf.getvalue()).decode('utf-8')
-        buf.close()
+        encoded_image = pairplot_image(selected_features)
         return html.Img(src=f'data:image/png;base64,{encoded_image}', style={'width': '100%'})
 
     return html.Div("Veuillez sélectionner les caractéristiques et cliquer sur Générer un Pairplot", style={'color': 'red', 'font-weight': 'bold'})
 
 
-
-
-@callback(
-    Output('genre-bar-plot', 'figure'),
-    Input('genre-bar-plot', 'id')
-)
-def update_genre_plot(_):
-    fig = px.bar(
-        genre_counts,
-        x='Count',
-        y='Genre',
-        orientation='h',
-        color='Genre', 
-        labels={'Count': 'Count', 'Genre': 'Genre'}
-    )
-    fig.update_layout(margin=dict(l=40, r=40, t=40, b=80))
-    return fig
-
-
 @callback(
-    Output("genre-trends-plot", "figure"),
-    Input("genre-trends-plot", "id") 
+    Output('splom-container', 'children'),
+    Input('generate-splom', 'n_clicks'),
+    State('pairplot-features', 'value'),
+    prevent_initial_call=True
 )
-def update_genre_trends_plot(_):
-    total_counts = genre_distribution.sum()
-    top_genres = total_counts.nlargest(5).index
-    top_genre_distribution = genre_distribution[top_genres]
-    fig = px.line(
-        top_genre_distribution,
-        x=top_genre_distribution.index,
-        y=top_genre_distribution.columns,
-        labels={"value": "Count", "index": "Year"},
-    )
-
-    fig.update_layout(
-        legend_title="Genre",
-        xaxis_title="Year",
-        yaxis_title="Count",
-        legend=dict(orientation="v", yanchor="top", y=0.75,xanchor="left", x=1.05),
-        margin=dict(l=20, r=120, t=40, b=20)
-    )
-
-    return fig
+def update_splom(n_clicks, selected_features):
+    if n_clicks > 0 and selected_features:
+        features = tuple(col for col in numeric_features if col in selected_features)
+        return dcc.Graph(figure=registry.get('eda.splom', store.version, features))
+    return html.Div("Veuillez sélectionner les caractéristiques numériques", style={'color': 'red', 'font-weight': 'bold'})
 
 
+# Static figures, filled when the page is displayed from the memoized registry
 @callback(
-    Output("average-gross-plot", "figure"),
-    Input("average-gross-plot", "id") 
+    [Output('top-directors-bar-plot', 'figure'),
+     Output('certificate-bar-plot', 'figure'),
+     Output('genre-bar-plot', 'figure'),
+     Output('genre-trends-plot', 'figure'),
+     Output('average-gross-plot', 'figure'),
+     Output('correlation-heatmap', 'figure'),
+     Output('votes-gross-scatter', 'figure')],
+    Input('genre-bar-plot', 'id')
 )
-def update_average_gross_plot(_):
-    average_gross = expanded_frame.groupby("Genre")["Gross"].mean().sort_values(ascending=False)
-    fig = px.bar(
-        average_gross,
-        x=average_gross.index,
-        y=average_gross.values,
-        labels={"x": "Genre", "y": "Average Gross Revenue"},
-        color=average_gross.index,
-    )
-    fig.update_layout(
-        xaxis_title="Genre",
-        yaxis_title="Average Gross Revenue",
-        xaxis_tickangle=70, 
-        margin=dict(l=20, r=20, t=40, b=100) 
-    )
-    return fig
+def update_static_figures(_):
+    return tuple(registry.get(name, store.version) for name in [
+        'eda.top_directors', 'eda.certificates', 'eda.genres', 'eda.genre_trends',
+        'eda.average_gross', 'eda.correlation', 'eda.votes_gross',
+    ])
 
 
 @callback(
@@ -296,29 +416,4 @@ def update_average_gross_plot(_):
     [Input('genre-dropdown', 'value')]
 )
 def update_graphs(selected_genre):
-    if selected_genre == 'All':
-        filtered_df = df
-    else:
-        filtered_df = df[df['Genre'].str.contains(selected_genre, na=False)]
-    avg_rating_per_year = (
-        filtered_df.groupby('Released_Year')['IMDB_Rating'].mean().reset_index()
-    ).dropna().sort_values('Released_Year')
-
-    avg_gross_per_year = (
-        filtered_df.groupby('Released_Year')['Gross'].mean().reset_index()
-    ).dropna().sort_values('Released_Year')
-    rating_fig = px.bar(
-        avg_rating_per_year,
-        x='Released_Year',
-        y='IMDB_Rating',
-        labels={'Released_Year': 'Year', 'IMDB_Rating': 'Average IMDb Rating'},
-        color_discrete_sequence=['#636EFA']
-    ).update_layout(xaxis=dict(tickangle=45), height=500)
-    gross_fig = px.bar(
-        avg_gross_per_year,
-        x='Released_Year',
-        y='Gross',
-        labels={'Released_Year': 'Year', 'Gross': 'Average Gross Revenue'},
-        color_discrete_sequence=['#EF553B']
-    ).update_layout(xaxis=dict(tickangle=45), height=500)
-    return rating_fig, gross_fig
\ No newline at end of file
+    return registry.get('eda.yearly', store.version, selected_genre)
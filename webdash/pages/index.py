@@ -1,15 +1,22 @@
-import pandas as pd
+from functools import lru_cache
+
 import dash
-from dash import dcc, html, callback, Input, Output
+from dash import dcc, html, ctx, Input, Output
 import dash_bootstrap_components as dbc
-from data.loader import getDataset
+from data.filters import MovieFilter, sortRanks, sortRows
+from data.store import getStore
+from webdash.memo import memoize
+from webdash.metrics import callback
 import dash_table
 # Load Dataset
-df = getDataset()
+store = getStore()
+df = store.frame()
+movie_filter = MovieFilter(df['IMDB_Rating'], store.genres)
 
+TABLE_COLUMNS = ['Series_Title', 'Director', 'Star1', 'Star2', 'Star3', 'Star4']
+PAGE_SIZE = 10
+sort_ranks = sortRanks(df, TABLE_COLUMNS)
 
-df['Genre'] = df['Genre'].fillna('Unknown') 
-df['IMDB_Rating'] = pd.to_numeric(df['IMDB_Rating'], errors='coerce')
 dash.register_page(__name__, order=0, path='/')
 
 # Layout
@@ -25,7 +32,7 @@ layout = dbc.Container([
             html.Label("Sélectionnez le(s) genre(s) :"),
             dcc.Dropdown(
                 id='genre-filter',
-                options=[{'label': genre, 'value': genre} for genre in df['Genre'].str.split(', ').explode().unique()],
+                options=[{'label': genre, 'value': genre} for genre in store.genres.appearance],
                 multi=True,
                 placeholder="Sélectionnez un ou plusieurs genres"
             ),
@@ -46,45 +53,70 @@ layout = dbc.Container([
         dbc.Col(html.H3("Films filtrés :", className="text-center mt-4"), width=12)
     ]),
     dbc.Row([
-        dbc.Col(
-            html.Div(id='filtered-results', className="mt-4"), width=12
-        )
+        dbc.Col([
+            html.Div(id='filtered-results', className="mt-4"),
+            # Paging and sorting run on the server, the table only receives the visible page
+            html.Div(dash_table.DataTable(
+                id='filtered-table',
+                columns=[{"name": col, "id": col} for col in TABLE_COLUMNS],  # Set column names
+                page_current=0,
+                page_size=PAGE_SIZE,  # Number of rows per page
+                page_action='custom',
+                sort_action='custom',  # Enable sorting
+                sort_mode='single',
+                sort_by=[],
+                style_table={'overflowX': 'auto'},  # Horizontal scroll for long tables
+                style_cell={'textAlign': 'left'},  # Align text to the left
+                style_header={'fontWeight': 'bold'},  # Bold headers
+                style_data={'whiteSpace': 'normal', 'height': 'auto'},  # Wrap text for long cell values
+                filter_action="none"  # Disable the filtering feature
+            ), id='filtered-table-container', className="mt-4")
+        ], width=12)
     ])
 ])
 
 
 
+# Callbacks read dash.ctx to reset the page, the filtered rows are memoized instead of the callback
+@lru_cache(maxsize=128)
+@memoize('index.filtered_rows')
+def filtered_rows(selected_genres, rating_range, sort_column, descending):
+    """
+    Positions of the filtered movies in display order, cached per filter and sort (in the process,
+    then shared by the workers).
+    """
+    rows = movie_filter.rows(list(selected_genres), rating_range)
+    if sort_column is not None:
+        rows = sortRows(rows, sort_ranks[sort_column], descending)
+    return rows
+
+
 @callback(
-    Output('filtered-results', 'children'),
-    [Input('genre-filter', 'value'), Input('rating-filter', 'value')]
+    [Output('filtered-results', 'children'),
+     Output('filtered-table-container', 'style'),
+     Output('filtered-table', 'data'),
+     Output('filtered-table', 'page_count'),
+     Output('filtered-table', 'page_current')],
+    [Input('genre-filter', 'value'), Input('rating-filter', 'value'),
+     Input('filtered-table', 'page_current'), Input('filtered-table', 'sort_by')]
 )
-def update_filtered_results(selected_genres, rating_range):
-    # Filter by Rating Range
-    filtered_df = df[(df['IMDB_Rating'] >= rating_range[0]) & (df['IMDB_Rating'] <= rating_range[1])]
+def update_filtered_results(selected_genres, rating_range, page_current, sort_by):
+    # Back to the first page whenever the filter or the sort changes
+    if 'filtered-table.page_current' not in ctx.triggered_prop_ids or not page_current:
+        page_current = 0
+    sort_column = sort_by[0]['column_id'] if sort_by else None
+    descending = bool(sort_by) and sort_by[0]['direction'] == 'desc'
 
-    # Apply Multi-Genre Filter
-    if selected_genres:
-        # Check if all selected genres exist in the `Genre` column
-        filtered_df = filtered_df[
-            filtered_df['Genre'].apply(lambda genres: all(genre in genres.split(', ') for genre in selected_genres))
-        ]
+    # Filter by Rating Range and movies having all the selected genres
+    rows = filtered_rows(tuple(selected_genres or ()), tuple(rating_range), sort_column, descending)
 
     # If no results, show message
-    if filtered_df.empty:
-        return html.Div("No movies match the selected criteria.", style={'color': 'red', 'font-weight': 'bold'})
-
-    # Select relevant columns for display
-    filtered_df = filtered_df[['Series_Title', 'Director', 'Star1', 'Star2', 'Star3', 'Star4']]
+    if len(rows) == 0:
+        return (html.Div("No movies match the selected criteria.", style={'color': 'red', 'font-weight': 'bold'}),
+                {'display': 'none'}, [], 1, 0)
 
-    # Create the paginated table
-    return dash_table.DataTable(
-        data=filtered_df.to_dict('records'),  # Convert dataframe to dictionary for display
-        columns=[{"name": col, "id": col} for col in filtered_df.columns],  # Set column names
-        page_size=10,  # Number of rows per page
-        sort_action="native",  # Enable sorting
-        style_table={'overflowX': 'auto'},  # Horizontal scroll for long tables
-        style_cell={'textAlign': 'left'},  # Align text to the left
-        style_header={'fontWeight': 'bold'},  # Bold headers
-        style_data={'whiteSpace': 'normal', 'height': 'auto'},  # Wrap text for long cell values
-        filter_action="none"  # Disable the filtering feature
-    )
\ No newline at end of file
+    # Only the visible page is sent to the browser
+    page_count = -(-len(rows) // PAGE_SIZE)
+    page_current = min(page_current, page_count - 1)
+    page_rows = rows[page_current * PAGE_SIZE:(page_current + 1) * PAGE_SIZE]
+    return None, {}, df.iloc[page_rows][TABLE_COLUMNS].to_dict('records'), page_count, page_current
@@ -1,63 +1,55 @@
-import pandas as pd
+import numpy as np
 import dash
-from dash import dcc, html, Input, Output , callback
+from dash import dcc, html, Input, Output
 import dash_bootstrap_components as dbc
 import networkx as nx
 import plotly.graph_objects as go
-from data.loader import getDataset
+from data.networks import CollaborationIndex, DirectorActorIndex, coOccurrenceGraph
+from data.store import getStore
+from webdash.figures import registry
+from webdash.graphs import edgeTrace, nodePositions, scatterTrace
+from webdash.layouts import layouts
+from webdash.metrics import callback
 # Load Dataset
-df = getDataset()
+store = getStore()
+df = store.frame()
 
 actors_columns = ['Star1', 'Star2', 'Star3', 'Star4']
+# Actor IDs and the movie × actor matrix, shared by every genre of the actor network
+collaborations = CollaborationIndex(df[actors_columns])
+# Director and actor IDs of every movie, shared by every threshold of the director network
+credits = DirectorActorIndex(df['Director'], df[actors_columns])
+titles = df['Series_Title'].to_numpy(dtype=object)
+MIN_MOVIES_RANGE = range(2, 15)
 
 """
 Network showing the link between Genre that are commonly associated with each other (the bigger the node, the more common the association)
 """
-def genre_network():
-    G = nx.Graph()
-    for _, row in df.iterrows():
-        genres = row['Genre'].split(', ')
-        for genre in genres:
-            if genre not in G.nodes:
-                G.add_node(genre, weight=0)
-            for genre2 in genres:
-                if genre2 != genre:
-                    if G.has_edge(genre, genre2):
-                        G[genre][genre2]['weight'] += 1
-                    else:
-                        G.add_edge(genre, genre2, weight=1)
+# Not part of the page layout: built on demand only, not prewarmed at every boot
+@registry.register('reseaux.genre_network', prewarm=False)
+def build_genre_network():
+    # Co-occurrences come from one sparse product over the movie × genre matrix, computed once per dataset
+    counts, pairs = store.genres.cooccurrence()
+    G = coOccurrenceGraph(store.genres.vocabulary, counts, pairs, order=store.genres.appearance)
 
-    pos = nx.spring_layout(G, k=0.5, seed=42)
-    edge_x = []
-    edge_y = []
-    for edge in G.edges(data=True):
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
+    pos = layouts.positions(G, family='genres')
+    nodes, xy = nodePositions(G, pos)
+    edge_trace = edgeTrace(G, nodes, xy, width=2, color='#888')
 
-    edge_trace = go.Scatter(
-        x=edge_x, y=edge_y,
-        line=dict(width=2, color='#888'),
-        hoverinfo='none',
-        mode='lines')
-    
-    node_x = []
-    node_y = []
     node_text = []
     node_size = []
+    max_weight = max(weight for _, weight in G.nodes(data='weight'))
     for node in G.nodes(data=True):
-        x, y = pos[node[0]]
-        node_x.append(x)
-        node_y.append(y)
+        node_size.append(10 + 30 * node[1]['weight'] / max_weight)
         neighbors = list(G.neighbors(node[0]))
-        text = f"{node[0]}<br>"
+        text = f"{node[0]} ({node[1]['weight']} films)<br>"
         for neighbor in neighbors:
             text += f"{neighbor}: {G[node[0]][neighbor]['weight']}<br>"
         node_text.append(text)
 
-    node_trace = go.Scatter(
-        x=node_x, y=node_y,
+    node_trace = scatterTrace(
+        len(nodes),
+        x=xy[:, 0], y=xy[:, 1],
         mode='markers',
         text=node_text,
         hoverinfo='text',
@@ -76,6 +68,10 @@ def genre_network():
                      ))
 
 
+def genre_network():
+    return registry.get('reseaux.genre_network', store.version)
+
+
 dash.register_page(__name__)
 # Layout
 layout = dbc.Container([
@@ -90,7 +86,7 @@ layout = dbc.Container([
             html.Label("Genre de film:"),
             dcc.Dropdown(
                 id='genre-dropdown',
-                options=[{'label': genre, 'value': genre} for genre in df['Genre'].str.split(', ').explode().unique()],
+                options=[{'label': genre, 'value': genre} for genre in store.genres.appearance],
                 value='Action'
             ),
             dcc.Graph(
@@ -104,8 +100,8 @@ layout = dbc.Container([
             html.Label("Nombre minimum de films par réalisateur:"),
             dcc.Slider(
                 id='min-movies-slider',
-                min=2,
-                max=14,
+                min=MIN_MOVIES_RANGE[0],
+                max=MIN_MOVIES_RANGE[-1],
                 step=1,
                 value=2,
                 marks={i: str(i) for i in range(2, 14)}
@@ -124,58 +120,28 @@ layout = dbc.Container([
     Input('genre-dropdown', 'value')
 )
 def actor_network(genre):
-    df_copy = df.copy()
+    return registry.get('reseaux.actor_network', store.version, genre)
 
-    # Filter movies by genre (Movie have multiple genres)
-    df_copy = df_copy.assign(Genre=df['Genre'].str.split(', ')).explode('Genre')
-    df_copy = df_copy[df_copy['Genre'].apply(lambda x: genre in x)]
 
-    # Step 1: Extract Top 20 Actors
-    actors_df = pd.melt(df_copy, value_vars=actors_columns, value_name='Actor').dropna()
-    top_actors = actors_df['Actor'].value_counts().head(50).index.tolist()
+@registry.register('reseaux.actor_network', prewarm=[(genre,) for genre in store.genres.appearance])
+def build_actor_network(genre):
+    # Step 1: Extract Top 50 Actors of the genre's movies
+    rows = store.genres.rows([genre])
+    top_actors = collaborations.top(rows, 50)
 
-    # Step 2: Filter Collaborations Between Top Actors
-    collaborations = []
-    for _, row in df_copy.iterrows():
-        movie_actors = set([row[col] for col in actors_columns if row[col] in top_actors])
-        collaborations.extend([(a1, a2) for a1 in movie_actors for a2 in movie_actors if a1 != a2])
+    # Step 2: Collaborations Between Top Actors, weighted by their number of movies together
+    G = collaborations.graph(rows, top_actors)
 
-    # Create a DataFrame for edges
-    edges_df = pd.DataFrame(collaborations, columns=['Actor1', 'Actor2'])
-    edges_df = edges_df.groupby(['Actor1', 'Actor2']).size().reset_index(name='Weight')
-
-    # Step 3: Build the Graph
-    G = nx.Graph()
-    for _, row in edges_df.iterrows():
-        G.add_edge(row['Actor1'], row['Actor2'], weight=row['Weight'])
+    # Step 3: Generate Plotly Graph from NetworkX Graph
+    pos = layouts.positions(G, family='actors')  # Layout for nodes, cached and warm-started across genres
+    nodes, xy = nodePositions(G, pos)
+    edge_trace = edgeTrace(G, nodes, xy, width=0.5, color='#888')
 
-    # Step 4: Generate Plotly Graph from NetworkX Graph
-    pos = nx.spring_layout(G, k=0.5, seed=42)  # Layout for nodes
-    edge_x = []
-    edge_y = []
-    for edge in G.edges(data=True):
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
+    node_text = [f"{node} ({G.degree[node]} connections)" for node in nodes]
 
-    edge_trace = go.Scatter(
-        x=edge_x, y=edge_y,
-        line=dict(width=0.5, color='#888'),
-        hoverinfo='none',
-        mode='lines')
-
-    node_x = []
-    node_y = []
-    node_text = []
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-        node_text.append(f"{node} ({G.degree[node]} connections)")
-
-    node_trace = go.Scatter(
-        x=node_x, y=node_y,
+    node_trace = scatterTrace(
+        len(nodes),
+        x=xy[:, 0], y=xy[:, 1],
         mode='markers+text',
         text=node_text,
         textposition="top center",
@@ -199,63 +165,34 @@ def actor_network(genre):
     Input('min-movies-slider', 'value')
 )
 def movie_network(min_movies):
+    return registry.get('reseaux.movie_network', store.version, min_movies)
+
+
+@registry.register('reseaux.movie_network', prewarm=[(min_movies,) for min_movies in MIN_MOVIES_RANGE])
+def build_movie_network(min_movies):
+    network = credits.network(min_movies)
+    names = credits.names[network.people]
+    first, second = credits.names[network.edges[0]], credits.names[network.edges[1]]
     G = nx.Graph()
-    df_copy = df.copy()
-    # filter Directors with less than min_movies
-    df_copy = df_copy.groupby('Director').filter(lambda x: len(x) >= min_movies)
-    for _, row in df_copy.iterrows():
-        movie = row['Series_Title']
-        director = row['Director']
-        actors = df_copy.loc[df_copy['Series_Title'] == movie, actors_columns].values[0]
-        if director not in G.nodes:
-            G.add_node(director, node_type='director')
-        for actor in actors:
-            if actor not in G.nodes:
-                G.add_node(actor, node_type='actor')
-            G.add_edge(director, actor, movie=movie)
-            
-    # Filter nodes based on minimum movies and only keep the Director and Actor nodes
-    nodes_to_remove = [node for node, degree in dict(G.degree()).items() if degree < min_movies and G.nodes[node].get('node_type') == 'director']
-    G.remove_nodes_from(nodes_to_remove)
-    # Remove actors with less than 2 connection
-    nodes_to_remove = [node for node, degree in dict(G.degree()).items() if degree < 2 and G.nodes[node].get('node_type') == 'actor']
-    G.remove_nodes_from(nodes_to_remove)
+    G.add_nodes_from(names)
+    G.add_edges_from(zip(first, second))
 
-    pos = nx.spring_layout(G, k=0.5, seed=42)
-    edge_x = []
-    edge_y = []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
+    pos = layouts.positions(G, family='people')
+    nodes, xy = nodePositions(G, pos)
+    edge_trace = edgeTrace(G, nodes, xy, width=0.5, color='#888')
 
-    edge_trace = go.Scatter(
-        x=edge_x, y=edge_y,
-        line=dict(width=0.5, color='#888'),
-        hoverinfo='none',
-        mode='lines')
-    
-    node_x = []
-    node_y = []
-    node_text = []
-    node_color = []
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-        node_text.append(node + f" ({G.degree[node]} connections)<br>" + "<br>".join([f"- {G.edges[edge]['movie']} - {edge[1]}" for edge in G.edges(node)]) if G.nodes[node].get('node_type') == 'director' 
-                         else 
-                            node + f" ({G.degree[node]} connections)<br>" + "<br>".join([f"- {G.edges[edge]['movie']} - {edge[1]}" for edge in G.edges(node)]))
-        node_color.append('#00bfff' if G.nodes[node].get('node_type') == 'director' else '#ff6347')
+    # Hover: every collaboration of the node (movie - collaborator), in the order they were met
+    node_text = credits.hover_text(network, titles)
+    node_color = np.where(network.is_director, '#00bfff', '#ff6347').tolist()
 
-    node_trace = go.Scatter(
-        x=node_x, y=node_y,
+    node_trace = scatterTrace(
+        len(nodes),
+        x=xy[:, 0], y=xy[:, 1],
         mode='markers',
         text=node_text,
         hoverinfo='text',
         marker=dict(
-            size=[10 + 2 * G.degree[node] for node in G.nodes()],
+            size=(10 + 2 * network.degrees).tolist(),
             color=node_color,
             line_width=2))
     
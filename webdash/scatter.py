@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from dash import html
+
+# Most points sent to the browser by a scatter plot, more rows are sampled down to about this many
+POINT_BUDGET = int(os.environ.get('SCATTER_POINT_BUDGET', 5000))
+# Small clusters keep at least this many points (or all of theirs), so sampling never hides a cluster
+MIN_CLUSTER_POINTS = 20
+
+DETAIL_COLUMNS = [
+    'Series_Title', 'Released_Year', 'Genre', 'Director', 'IMDB_Rating', 'Runtime', 'No_of_Votes', 'Gross',
+]
+
+
+def stratifiedSample(labels, budget=POINT_BUDGET, random_state=42):
+    """
+    Positions (in increasing order) of about `budget` rows, sampled within each cluster of `labels`
+    in proportion to its size. All rows when they fit in the budget.
+    """
+    if len(labels) <= budget:
+        return np.arange(len(labels))
+    clusters, _ = pd.factorize(labels)
+    counts = np.bincount(clusters)
+    quotas = np.maximum(counts * budget // len(labels), np.minimum(counts, MIN_CLUSTER_POINTS))
+
+    # Rows grouped by cluster, in random order within a cluster: a row is kept if its rank is within the quota
+    order = np.lexsort((np.random.default_rng(random_state).random(len(labels)), clusters))
+    ranks = np.empty(len(labels), dtype=np.int64)
+    ranks[order] = np.arange(len(labels)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.flatnonzero(ranks < quotas[clusters])
+
+
+def clusterScatter(df, labels, color, title, hover_data, budget=POINT_BUDGET, **axes):
+    """
+    px.scatter (or px.scatter_3d given a z axis) of `df` colored by cluster `labels`, with a level of detail:
+    above `budget` rows, a stratified sample of every cluster is drawn, with a light hover. The row position of
+    every point is its first custom data, for pointDetail() to show the whole row of a clicked point.
+    """
+    rows = stratifiedSample(labels, budget)
+    sampled = len(rows) < len(df)
+    plot_df = df.iloc[rows].assign(**{color: np.asarray(labels)[rows], '_row': rows})
+    if sampled:
+        title = f'{title} ({len(rows)} of {len(df)} movies shown)'
+        hover_data = ['Series_Title']
+    scatter = px.scatter_3d if 'z' in axes else px.scatter
+    return scatter(plot_df, color=color, title=title, custom_data=['_row'], hover_data=hover_data, **axes)
+
+
+def pointDetail(df, click_data, columns=DETAIL_COLUMNS):
+    """
+    Details of the clicked point of a clusterScatter() figure, fetched from the full dataset.
+    """
+    if not click_data:
+        return "Cliquez sur un point pour afficher le détail du film."
+    row = df.iloc[int(click_data['points'][0]['customdata'][0])]
+    return html.Ul([html.Li([html.B(f"{column} : "), str(row[column])]) for column in columns])